@@ -1,24 +1,33 @@
 import asyncio
 import logging
+import multiprocessing
+import signal
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 from aiogram.exceptions import TelegramBadRequest
 from aiogram_tonconnect.middleware import AiogramTonConnectMiddleware
-from fluentogram import TranslatorHub
-from pytonconnect import TonConnect
-from datetime import datetime, timedelta
-from backoff import on_exception, expo
+from tonutils.tonconnect import TonConnect
 
 from utils.i18n import create_translator_hub
 from utils.middleware import TranslatorRunnerMiddleware
-from utils.db import db_start, get_pending_bridges, update_status
-from utils.rhino import check_bridge_status
+from utils.db import db_start, db_close, redis_start, redis_close, set_transaction_writer, TcStorage
+from utils.transaction_log import TransactionLogWriter
+from utils.partitions import PartitionMaintainer
 from utils.jupiter import jupiter_api
-from handlers import start_router, bridge_router, swap_router
-from keyboards.keyboards import bridge_completed
-from config import get_config, BotConfig, TonConnect
+from utils.rhino import rhino_client
+from utils.poller import BridgePoller
+from utils.notifier import Notifier
+from utils.fsm_storage import create_fsm_storage
+from utils.bridge_callbacks import BridgeCallbackReceiver
+from utils.webhook import WebhookServer
+from utils.confirmations import confirmation_registry
+from utils.connector_cache import CachedTonConnect
+from handlers import start_router, bridge_router, swap_router, history_router
+from config import (get_config, BotConfig, TonConnect as TonConnectConfig, PollerConfig, BridgeCallbackConfig, NotifierConfig,
+                    FsmConfig, WebhookConfig, TransactionLogConfig,
+                    PartitionConfig)
 
 
 load_dotenv(".env")
@@ -26,101 +35,165 @@ load_dotenv(".env")
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-@on_exception(expo, Exception, max_tries=5)
-async def check_bridge_status_with_backoff(tx_id):
-    return await check_bridge_status(tx_id)
+async def wait_for_shutdown():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
 
-async def poll_pending_bridges(bot: Bot, translator_hub: TranslatorHub):
-    while True:
-        try:
-            pending_bridges = await get_pending_bridges()
-            for tx in pending_bridges:
-                if tx["created_at"] < datetime.now() - timedelta(hours=1):
-                    await update_status(transaction_id=tx["id"], status="failed_bridge")
-                    i18n = translator_hub.get_translator_by_locale("ru")
-                    try:
-                        await bot.send_message(
-                            chat_id=tx["user_id"],
-                            text=i18n.bridge.failed.message()
-                        )
-                    except TelegramBadRequest as e:
-                        logger.warning(f"Failed to send bridge failed message to {tx['user_id']}: {e}")
-                    continue
-                status_info = await check_bridge_status_with_backoff(tx["tx_id"])
-                if status_info["status"] == "executed":
-                    await update_status(
-                        transaction_id=tx["id"],
-                        status="bridge_completed",
-                        amount_out=status_info["amount_out"],
-                        solana_tx_hash=status_info["solana_tx_hash"]
-                    )
-                    i18n = translator_hub.get_translator_by_locale("ru")
-                    try:
-                        await bot.send_message(
-                            chat_id=tx["user_id"],
-                            text=i18n.bridge.completed.message(
-                                amount_out=float(status_info["amount_out"]) / 10**6 if status_info["amount_out"] else "0",
-                                solana_wallet=tx["solana_wallet"]
-                            ),
-                            reply_markup=bridge_completed(i18n)
-                        )
-                    except TelegramBadRequest as e:
-                        logger.warning(f"Failed to send bridge completed message to {tx['user_id']}: {e}")
-                elif status_info["status"] in ["failed", "stuck"]:
-                    await update_status(transaction_id=tx["id"], status="failed_bridge")
-                    i18n = translator_hub.get_translator_by_locale("ru")
-                    try:
-                        await bot.send_message(
-                            chat_id=tx["user_id"],
-                            text=i18n.bridge.failed.message()
-                        )
-                    except TelegramBadRequest as e:
-                        logger.warning(f"Failed to send bridge failed message to {tx['user_id']}: {e}")
-        except Exception as e:
-            logger.error(f"Polling error: {e}")
-        await asyncio.sleep(30)
-
-async def main():
+async def main(worker_index: int = 0):
     logging.basicConfig(
         level=logging.INFO,
         format='%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s'
     )
-    logger.info('Starting Bot')
+    # Only the first worker runs the bridge poller and its helpers
+    primary = worker_index == 0
+    logger.info(f'Starting Bot (worker {worker_index})')
 
     bot_config = get_config(BotConfig, "bot")
-    tonconnect_config = get_config(TonConnect, "tonconnect")
+    webhook_config = get_config(WebhookConfig, "webhook")
+    tonconnect_config = get_config(TonConnectConfig, "tonconnect")
+    if bot_config.mode == "webhook" and not webhook_config.url:
+        logger.error("Webhook mode requires webhook.url. Exiting.")
+        return
     pool = await db_start()
     if not pool:
         logger.error("Failed to connect to the database. Exiting.")
         return
+    try:
+        await redis_start()
+    except Exception as e:
+        logger.error(f"Failed to connect to Redis: {e}. Exiting.")
+        return
+
+    transaction_log_config = get_config(TransactionLogConfig, "transaction_log")
+    transaction_writer = None
+    if transaction_log_config.write_behind:
+        transaction_writer = TransactionLogWriter(transaction_log_config)
+        # Only one process replays rows a crashed run left in the stream
+        await transaction_writer.start(recover=primary)
+        set_transaction_writer(transaction_writer)
 
     bot = Bot(token=bot_config.token.get_secret_value(),
               default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher(pool=pool)
+    storage, events_isolation = create_fsm_storage(get_config(FsmConfig, "fsm"))
+    dp = Dispatcher(pool=pool, storage=storage, events_isolation=events_isolation)
     
     translator_hub = create_translator_hub()
     dp.update.middleware(TranslatorRunnerMiddleware())
-    dp.update.middleware(AiogramTonConnectMiddleware(tonconnect=TonConnect(manifest_url=tonconnect_config.manifest)))
-    dp.include_routers(start_router, bridge_router, swap_router)
+    tonconnect = CachedTonConnect(
+        TonConnect(storage=TcStorage(), manifest_url=str(tonconnect_config.manifest)),
+        tonconnect_config
+    )
+    tonconnect.start()
+    dp.update.middleware(AiogramTonConnectMiddleware(tonconnect=tonconnect))
+    dp.include_routers(start_router, bridge_router, swap_router, history_router)
+    # Runs before the bot session is closed, so drained jobs can still answer users
+    dp.shutdown.register(confirmation_registry.drain)
 
-    try:
-        await bot.delete_webhook(drop_pending_updates=True)
-        logger.info("Webhook deleted, ready for polling.")
-    except TelegramBadRequest as e:
-        logger.error(f"Failed to delete webhook: {e}")
+    if bot_config.mode == "webhook":
+        if primary:
+            try:
+                await bot.set_webhook(
+                    url=f"{webhook_config.url.rstrip('/')}{webhook_config.path}",
+                    secret_token=webhook_config.secret_token.get_secret_value() or None,
+                    max_connections=webhook_config.max_in_flight,
+                    drop_pending_updates=True
+                )
+                logger.info("Webhook set.")
+            except TelegramBadRequest as e:
+                logger.error(f"Failed to set webhook: {e}")
+    else:
+        try:
+            await bot.delete_webhook(drop_pending_updates=True)
+            logger.info("Webhook deleted, ready for polling.")
+        except TelegramBadRequest as e:
+            logger.error(f"Failed to delete webhook: {e}")
 
-    asyncio.create_task(poll_pending_bridges(bot, translator_hub))
+    await rhino_client.start()
+    notifier = None
+    callback_receiver = None
+    if primary:
+        poller_config = get_config(PollerConfig, "poller")
+        callback_config = get_config(BridgeCallbackConfig, "bridge_callbacks")
+        if callback_config.enabled:
+            # Pushed callbacks carry the updates; polling is only a slow reconciliation sweep
+            poller_config = poller_config.model_copy(update={
+                "check_delay_base": callback_config.reconciliation_interval,
+                "check_delay_max": max(poller_config.check_delay_max, callback_config.reconciliation_interval)
+            })
+        notifier = Notifier(bot, get_config(NotifierConfig, "notifier"))
+        await notifier.start()
+        poller = BridgePoller(notifier, translator_hub, poller_config)
+        if callback_config.enabled:
+            callback_receiver = BridgeCallbackReceiver(poller, callback_config)
+            await callback_receiver.start()
+        asyncio.create_task(poller.run())
+        # Creates upcoming partitions right away, then re-checks and archives on a schedule
+        asyncio.create_task(PartitionMaintainer(get_config(PartitionConfig, "partitions")).run())
 
     try:
-        await dp.start_polling(bot, _translator_hub=translator_hub)
+        if bot_config.mode == "webhook":
+            webhook_server = WebhookServer(bot, dp, webhook_config, _translator_hub=translator_hub)
+            await dp.emit_startup(bot=bot, _translator_hub=translator_hub)
+            await webhook_server.start()
+            try:
+                await wait_for_shutdown()
+            finally:
+                await webhook_server.stop()
+                await dp.emit_shutdown(bot=bot, _translator_hub=translator_hub)
+                await bot.session.close()
+        else:
+            await dp.start_polling(bot, _translator_hub=translator_hub)
     finally:
+        if callback_receiver:
+            await callback_receiver.stop()
+        if notifier:
+            await notifier.stop()
+        await tonconnect.stop()
+        if transaction_writer:
+            await transaction_writer.stop()
+            set_transaction_writer(None)
         await jupiter_api.close_session()
+        await rhino_client.close()
+        await redis_close()
+        await db_close()
         logger.info("Closed API sessions")
 
-if __name__ == '__main__':
+def run_worker(worker_index: int = 0):
     try:
-        asyncio.run(main())
+        asyncio.run(main(worker_index))
     except (KeyboardInterrupt, SystemExit):
         logger.info("Bot stopped")
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+
+if __name__ == '__main__':
+    workers = 1
+    if get_config(BotConfig, "bot").mode == "webhook":
+        workers = get_config(WebhookConfig, "webhook").workers
+    if workers > 1 and get_config(FsmConfig, "fsm").storage != "redis":
+        # Each worker would keep its own in-memory FSM and users' flows would break between updates
+        logger.error(f"webhook.workers is {workers}, which requires fsm.storage: redis. Exiting.")
+        raise SystemExit(1)
+    if workers > 1:
+        # Pre-fork: every process serves the webhook port, worker 0 also runs the poller
+        processes = [multiprocessing.Process(target=run_worker, args=(i,)) for i in range(workers)]
+        for process in processes:
+            process.start()
+
+        def stop_workers(signum, frame):
+            # Workers shut down gracefully on SIGTERM; the joins below wait for them
+            logger.info(f"Received signal {signum}, stopping {workers} workers")
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        # Installed after forking so the workers keep their own handlers
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, stop_workers)
+        for process in processes:
+            process.join()
+    else:
+        run_worker()
@@ -1,12 +1,25 @@
-from pydantic import BaseModel, SecretStr, HttpUrl
+from pydantic import BaseModel, Field, SecretStr, HttpUrl
 from functools import lru_cache
 from yaml import load, SafeLoader
 from typing import TypeVar, Type, Optional
+import os
+import socket
 
 ConfigType = TypeVar("ConfigType", bound=BaseModel)
 
 class BotConfig(BaseModel):
     token: SecretStr
+    mode: str = "polling"
+
+class WebhookConfig(BaseModel):
+    url: Optional[str] = None
+    path: str = "/telegram/webhook"
+    host: str = "0.0.0.0"
+    port: int = 8080
+    secret_token: SecretStr = SecretStr("")
+    workers: int = 1
+    max_in_flight: int = 100
+    backpressure_timeout: float = 5
 
 class DbConfig(BaseModel):
     host: str
@@ -14,9 +27,60 @@ class DbConfig(BaseModel):
     user: str
     password: SecretStr
     database: str
+    min_size: int = 2
+    max_size: int = 10
+    max_queries: int = 50_000
+    max_inactive_connection_lifetime: float = 300
+    statement_cache_size: int = 256
+    command_timeout: float = 30
+    prepare_statements: bool = True
+    stats_interval: float = 300
+
+class RedisConfig(BaseModel):
+    host: str = "redis"
+    port: int = 6379
+    db: int = 0
+    max_connections: int = 50
+    socket_timeout: float = 5
+    socket_connect_timeout: float = 5
+    health_check_interval: int = 30
+    profile_cache_ttl: float = 30
+    profile_cache_size: int = 10_000
+
+class FsmConfig(BaseModel):
+    storage: str = "memory"
+    default_ttl: int = 3600
+    state_ttls: dict[str, int] = {
+        "BridgeForm:amount": 900,
+        "BridgeForm:solana_wallet": 900
+    }
+    isolate_events: bool = True
 
 class RhinoConfig(BaseModel):
     api_key: SecretStr
+    base_url: str = "https://api.rhino.fi"
+    pool_limit: int = 100
+    pool_limit_per_host: int = 50
+    keepalive_timeout: float = 60
+    dns_cache_ttl: int = 300
+    quote_timeout: float = 10
+    commit_timeout: float = 10
+    status_timeout: float = 5
+    prefetch_ttl: float = 60
+
+class JupiterConfig(BaseModel):
+    base_url: str = "https://quote-api.jup.ag/v6"
+    pool_limit: int = 100
+    pool_limit_per_host: int = 50
+    keepalive_timeout: float = 60
+    dns_cache_ttl: int = 300
+    quote_timeout: float = 5
+    swap_timeout: float = 10
+    slippage_bps: int = 50
+    quote_cache_ttl: float = 5
+    quote_amount_bucket: int = 1
+    price_ttl: float = 30
+    quote_reuse_window: float = 20
 
 class MemeCoinConfig(BaseModel):
     contract_address: str
@@ -25,6 +89,79 @@ class MemeCoinConfig(BaseModel):
 
 class TonConnect(BaseModel):
     manifest: HttpUrl
+    connector_cache_size: int = 10_000
+    connector_idle_ttl: float = 900
+    connector_stats_interval: float = 300
+
+class ResilienceConfig(BaseModel):
+    failure_threshold: int = 5
+    reset_timeout: float = 30
+    retry_ratio: float = 0.2
+    min_retry_tokens: float = 10
+    max_retry_tokens: float = 100
+
+class PollerConfig(BaseModel):
+    interval: float = 30
+    listen: bool = True
+    idle_interval: float = 300
+    min_interval: float = 1
+    concurrency: int = 10
+    max_tries: int = 5
+    bridge_timeout_minutes: int = 60
+    check_delay_base: float = 30
+    check_delay_factor: float = 2
+    check_delay_max: float = 600
+    claim_rows: bool = False
+    worker_id: str = f"{socket.gethostname()}:{os.getpid()}"
+    lease_seconds: float = 300
+    batch_size: int = 500
+
+class BridgeCallbackConfig(BaseModel):
+    enabled: bool = False
+    host: str = "0.0.0.0"
+    port: int = 8081
+    path: str = "/rhino/callback"
+    secret: SecretStr = SecretStr("")
+    reconciliation_interval: float = 600
+
+class NotifierConfig(BaseModel):
+    queue_key: str = "notify:queue"
+    workers: int = 4
+    global_rate: float = 25
+    per_chat_interval: float = 1
+    max_attempts: int = 5
+    stats_interval: float = 60
+    # Identifies this process's in-flight list; another instance reclaims it once owner_ttl passes without a heartbeat
+    worker_id: str = Field(default_factory=lambda: f"{socket.gethostname()}:{os.getpid()}")
+    owner_ttl: float = 30
+
+class TransactionLogConfig(BaseModel):
+    write_behind: bool = False
+    stream_key: str = "txlog:stream"
+    batch_size: int = 100
+    flush_interval: float = 0.2
+    wait_timeout: float = 10
+    retry_delay: float = 1
+    retry_delay_max: float = 60
+    dead_letter_key: str = "txlog:failed"
+
+class PartitionConfig(BaseModel):
+    months_ahead: int = 3
+    retention_months: int = 12
+    archive_enabled: bool = True
+    archive_dir: str = "archive"
+    maintenance_interval: float = 6 * 3600
+
+class IdempotencyConfig(BaseModel):
+    lock_ttl: int = 60
+    result_ttl: int = 600
+    wait_timeout: float = 10
+    poll_interval: float = 0.2
+
+class ConfirmationConfig(BaseModel):
+    timeout: float = 300
+    max_pending: int = 5000
+    drain_timeout: float = 10
 
 @lru_cache(maxsize=1)
 def parse_config_file() -> dict:
@@ -38,11 +175,14 @@ def parse_config_file() -> dict:
         raise ValueError(f"Error loading config file: {e}")
 
 def validate_config_data(config_dict: dict, root_key: str, model: Type[ConfigType]):
+    required_keys = [key for key, field in model.model_fields.items() if field.is_required()]
     if root_key not in config_dict:
+        # Sections whose fields all have defaults are optional
+        if not required_keys:
+            return
         raise ValueError(f"Key {root_key} not found in configuration.")
     
-    expected_keys = [key for key in model.__annotations__]
-    for key in expected_keys:
+    for key in required_keys:
         if key not in config_dict[root_key]:
             raise ValueError(f"Missing key '{key}' in '{root_key}' configuration.")
 
@@ -54,4 +194,4 @@ def get_config(model: Optional[Type[ConfigType]], root_key: str) -> ConfigType:
             raise ValueError(f"Key {root_key} not found in configuration.")
         return config_dict[root_key]
     validate_config_data(config_dict, root_key, model)
-    return model.model_validate(config_dict[root_key])
+    return model.model_validate(config_dict.get(root_key) or {})
@@ -1,3 +1,4 @@
 from .bridge import *
 from .dex_swap import *
 from .start import *
+from .history import *
@@ -2,19 +2,33 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram_tonconnect import ATCManager
-from pytonconnect.exceptions import UserRejectsError
+from tonutils.tonconnect import TonConnect
+from tonutils.tonconnect.models import Transaction, Message as TransactionMessage, SendTransactionResponse
+from tonutils.tonconnect.utils.exceptions import UserRejectsError, RequestTimeoutError, TonConnectError
 from utils.db import (get_wallet_by_user_id, log_transaction, update_status, 
-                     get_pending_bridges, get_config_by_user_id)
+                     get_pending_bridges, get_config_by_user_id,
+                     get_last_solana_wallet, set_last_solana_wallet)
 from utils.ton import encode_jetton_transfer
-from utils.rhino import create_bridge
+from utils.rhino import create_bridge, bridge_prefetcher
+from utils.confirmations import confirmation_registry
+from utils.idempotency import run_once
 from states.swap_form import BridgeForm
 from keyboards.keyboards import bridge_completed
-from fluentogram import TranslatorHub
+from fluentogram import TranslatorHub, TranslatorRunner
 import time
 import asyncio
+import logging
+from base64 import b64encode
+from contextlib import suppress
+from functools import partial
+
+logger = logging.getLogger(__name__)
 
 bridge_router = Router()
 
+# TON attached to the jetton transfer: covers its gas and the forwarded amount
+JETTON_TRANSFER_TON = int(0.05 * 10**9)
+
 @bridge_router.callback_query(F.text == 'bridge')
 async def bridge_command(
         callback: CallbackQuery, 
@@ -55,10 +69,21 @@ async def bridge_amount(
         await message.answer(text=i18n.config.error())
         return
     
-    await state.update_data(amount=amount)
+    # The amount message identifies this bridge flow for deduplicating the submission
+    await state.update_data(amount=amount, flow_id=message.message_id)
     await state.set_state(BridgeForm.solana_wallet)
     await message.answer(text=i18n.bridge.solana_wallet())
 
+    # Prepare the bridge while the user pastes their wallet: quote speculatively for the last wallet they used
+    last_solana_wallet = await get_last_solana_wallet(user_id=user_id)
+    if last_solana_wallet:
+        bridge_prefetcher.prefetch(
+            user_id=user_id,
+            amount=amount,
+            ton_wallet=config.get("jetton_wallet"),
+            solana_wallet=last_solana_wallet
+        )
+
 @bridge_router.message(BridgeForm.solana_wallet)
 async def bridge_solana_wallet(
         message: Message, 
@@ -80,65 +105,138 @@ async def bridge_solana_wallet(
         await message.answer(text=i18n.wallet.connect())
         return
     
+    if not confirmation_registry.has_capacity(user_id):
+        await message.answer(text=i18n.service.unavailable.message())
+        return
+    
     jetton_wallet = config.get("jetton_wallet")
     state_data = await state.get_data()
     amount = state_data.get("amount")
     destination_address = config.get("bridge_wallet")
     response_address = wallet.get("address")
 
-    bridge_response = await create_bridge(
-            amount=amount, 
-            solana_wallet=solana_wallet, 
-            jetton_wallet=jetton_wallet
+    async def submit_bridge():
+        bridge_response = await create_bridge(
+                amount=amount, 
+                solana_wallet=solana_wallet, 
+                jetton_wallet=jetton_wallet,
+                user_id=user_id
+                )
+        if bridge_response.get("unavailable"):
+            await message.answer(text=i18n.service.unavailable.message())
+            return None
+        if not bridge_response.get("success"):
+            await message.answer(text=i18n.bridge.error())
+            return None
+        await set_last_solana_wallet(user_id=user_id, solana_wallet=solana_wallet)
+        
+        transaction_id = bridge_response.get("transaction_id")
+        try:
+            db_transaction_id = await log_transaction(
+                user_id=user_id,
+                solana_wallet=solana_wallet,
+                amount_in=amount,
+                commission_amount=0,
+                operation_type="bridge",
+                status="pending",
+                tx_id=transaction_id
             )
-    if not bridge_response.get("success"):
-        await message.answer(text=i18n.bridge.error())
+        except asyncio.TimeoutError:
+            # The write-behind row is still queued and lands as pending, but without its id the
+            # confirmation can't settle it: don't ask for funds, the poller expires the unfunded quote
+            logger.warning(f"Logging bridge {transaction_id} for user {user_id} timed out, not sending it")
+            await message.answer(text=i18n.bridge.error())
+            return None
+        return {
+            "transaction_id": transaction_id,
+            "jetton_amount": bridge_response.get("jetton_amount"),
+            "db_transaction_id": db_transaction_id
+        }
+
+    # A resent wallet within the same flow must not open a second bridge
+    result, duplicate = await run_once(user_id, "bridge_submit", state_data.get("flow_id", message.message_id), submit_bridge)
+    if duplicate or result is None:
         return
     
-    transaction_id = bridge_response.get("transaction_id")
-    jetton_amount = bridge_response.get("jetton_amount")
-    
-    transaction = {
-        'valid_until': int(time.time() + 3600),
-        'messages': [
-            encode_jetton_transfer(
-                destination_address=destination_address,
-                jetton_amount=jetton_amount,
-                response_address=response_address,
-                forward_ton_amount=int(0.01 * 10 ** 9),
-                comment=f"Bridge {transaction_id}"
-            )
-        ]
-    }
-    
-    await log_transaction(
-        user_id=user_id,
-        solana_wallet=solana_wallet,
-        amount_in=str(amount),
-        commission_amount="0",
-        operation_type="bridge",
-        status="pending",
-        tx_id=transaction_id
+    transaction_id = result["transaction_id"]
+    db_transaction_id = result["db_transaction_id"]
+    body = encode_jetton_transfer(
+        destination_address=destination_address,
+        jetton_amount=result["jetton_amount"],
+        response_address=response_address,
+        forward_ton_amount=int(0.01 * 10 ** 9),
+        comment=f"Bridge {transaction_id}"
+    )
+    transaction = Transaction(
+        valid_until=int(time.time() + confirmation_registry.config.timeout),
+        messages=[TransactionMessage(
+            address=jetton_wallet,
+            amount=str(JETTON_TRANSFER_TON),
+            payload=b64encode(bytes.fromhex(body)).decode()
+        )]
     )
     
     await message.answer(text=i18n.bridge.wait())
+    await state.clear()
+    # The wallet may take minutes to confirm; wait in the background so the handler returns now.
+    # The job talks to the connector directly: ATCManager would write to this update's FSM state
+    job = await_bridge_confirmation(message, atc_manager.tonconnect, transaction, db_transaction_id, i18n)
+    # If the user starts another bridge first, this one's wallet request is abandoned: fail its row
+    on_superseded = partial(update_status, transaction_id=db_transaction_id, status="failed_bridge")
+    if not confirmation_registry.submit(user_id, job, on_superseded):
+        await message.answer(text=i18n.service.unavailable.message())
+        await update_status(transaction_id=db_transaction_id, status="failed_bridge")
+
+async def wallet_response(connector, rpc_request_id: int):
+    # The wallet's answer: SendTransactionResponse, or the TonConnectError it replied with
+    async with connector.pending_request_context(rpc_request_id) as result:
+        return result
+
+async def await_bridge_confirmation(
+        message: Message,
+        tonconnect: TonConnect,
+        transaction: Transaction,
+        transaction_id: int,
+        i18n: TranslatorRunner
+):
+    rpc_request_id = None
+    connector = None
     try:
-        await asyncio.wait_for(atc_manager.send_transaction(
-            transaction=transaction
-        ), 300)
-        await message.answer(text=i18n.bridge.sent())
+        connector = await tonconnect.init_connector(message.from_user.id)
+        if not connector.connected:
+            await message.answer(text=i18n.wallet.connect())
+            await update_status(transaction_id=transaction_id, status="failed_bridge")
+            return
+        # Returns once the request is on its way; the wallet's answer resolves the pending request
+        rpc_request_id = await connector.send_transaction(transaction)
+        result = await asyncio.wait_for(
+            wallet_response(connector, rpc_request_id),
+            confirmation_registry.config.timeout
+        )
+        if isinstance(result, SendTransactionResponse):
+            confirmation_registry.confirmed()
+            await message.answer(text=i18n.bridge.sent())
+            return
+        if isinstance(result, UserRejectsError):
+            await message.answer(text=i18n.bridge.rejected())
+        elif isinstance(result, RequestTimeoutError):
+            await message.answer(text=i18n.bridge.timeout())
+        else:
+            logger.error(f"Wallet returned an error for bridge transaction {transaction_id}: {result}")
+            await message.answer(text=i18n.bridge.error())
+        await update_status(transaction_id=transaction_id, status="failed_bridge")
     except asyncio.TimeoutError:
         await message.answer(text=i18n.bridge.timeout())
         await update_status(transaction_id=transaction_id, status="failed_bridge")
-    except UserRejectsError:
-        await message.answer(text=i18n.bridge.rejected())
-        await update_status(transaction_id=transaction_id, status="failed_bridge")
     except Exception as e:
         await message.answer(text=i18n.bridge.error())
         await update_status(transaction_id=transaction_id, status="failed_bridge")
-        print(f"Error: {e}")
-    
-    await state.clear()
+        logger.error(f"Bridge confirmation for transaction {transaction_id} failed: {e}", exc_info=True)
+    finally:
+        if connector is not None and rpc_request_id is not None:
+            # No-op once answered; otherwise withdraws the request from the connector
+            with suppress(TonConnectError):
+                connector.cancel_pending_request(rpc_request_id)
 
 @bridge_router.callback_query(lambda call: call.data == "check_bridge")
 async def check_bridge_callback(
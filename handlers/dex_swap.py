@@ -7,12 +7,30 @@ from fluentogram import TranslatorRunner
 
 from states.swap_form import BridgeForm
 from keyboards.keyboards import swap_confirm
-from utils.jupiter import get_token_pairs, initiate_swap
+from utils.jupiter import get_swap_quote, initiate_swap, swap_quote_amount
 from utils.db import log_transaction
+from utils.idempotency import run_once
+from utils.resilience import CircuitOpenError, UpstreamClientError
 from config import get_config, MemeCoinConfig
 
 swap_router = Router()
 
+def swap_commission(amount: float) -> float:
+    return amount * 0.02 if amount <= 100 else amount * 0.01
+
+def is_swappable(swap_amount: float) -> bool:
+    # initiate_swap refuses anything below the minimum; don't spend a Jupiter quote on it
+    commission = swap_commission(swap_amount)
+    min_swap_amount = get_config(MemeCoinConfig, "meme_coin").min_swap_amount
+    return (swap_amount - commission >= min_swap_amount
+            and swap_quote_amount(swap_amount - commission, commission) > 0)
+
+async def fetch_swap_quote(meme_coin: str, swap_amount: float) -> tuple:
+    # Quote exactly what confirm_swap will execute, so the quote can be reused there.
+    # Returns the quote and when it was fetched, which is earlier than now on a cache hit
+    commission = swap_commission(swap_amount)
+    return await get_swap_quote(meme_coin, swap_quote_amount(swap_amount - commission, commission))
+
 @swap_router.callback_query(F.data == "swap_all")
 async def swap_all(
         query: CallbackQuery, 
@@ -23,12 +41,23 @@ async def swap_all(
         data = await state.get_data()
         solana_wallet = data["solana_wallet"]
         amount_out = data.get("amount_out", 0)
+        if not is_swappable(amount_out):
+            await query.answer(
+                i18n.swap.min.amount.message(min_amount=get_config(MemeCoinConfig, "meme_coin").min_swap_amount),
+                show_alert=True
+            )
+            return
         await state.update_data(swap_amount=amount_out)
         meme_coin = get_config(MemeCoinConfig, "meme_coin").contract_address
-        token_pairs = await get_token_pairs(meme_coin, int(amount_out * 10**6))
+        token_pairs, quote_fetched_at = await fetch_swap_quote(meme_coin, amount_out)
         coin_count = int(token_pairs["outAmount"]) / 10**9
-        commission = amount_out * 0.02 if amount_out <= 100 else amount_out * 0.01
-        await state.update_data(meme_coin=meme_coin, coin_count=coin_count)
+        commission = swap_commission(amount_out)
+        await state.update_data(
+            meme_coin=meme_coin,
+            coin_count=coin_count,
+            quote=token_pairs,
+            quote_fetched_at=quote_fetched_at
+        )
         await query.message.edit_text(
             i18n.confirm.swap.message(
                 amount=amount_out,
@@ -40,6 +69,10 @@ async def swap_all(
             reply_markup=swap_confirm(i18n)
         )
         await state.set_state(BridgeForm.swap_confirm)
+    except CircuitOpenError:
+        await query.answer(i18n.service.unavailable.message(), show_alert=True)
+    except UpstreamClientError:
+        await query.answer(i18n.invalid.amount.message(), show_alert=True)
     except TelegramBadRequest:
         await query.answer()
 
@@ -71,13 +104,31 @@ async def process_swap_amount(
         except TelegramBadRequest:
             pass
         return
+    if not is_swappable(amount):
+        await message.answer(
+            i18n.swap.min.amount.message(min_amount=get_config(MemeCoinConfig, "meme_coin").min_swap_amount)
+        )
+        return
     data = await state.get_data()
     solana_wallet = data["solana_wallet"]
     meme_coin = get_config(MemeCoinConfig, "meme_coin").contract_address
-    token_pairs = await get_token_pairs(meme_coin, int(amount * 10**6))
+    try:
+        token_pairs, quote_fetched_at = await fetch_swap_quote(meme_coin, amount)
+    except CircuitOpenError:
+        await message.answer(i18n.service.unavailable.message())
+        return
+    except UpstreamClientError:
+        await message.answer(i18n.invalid.amount.message())
+        return
     coin_count = int(token_pairs["outAmount"]) / 10**9
-    commission = amount * 0.02 if amount <= 100 else amount * 0.01
-    await state.update_data(swap_amount=amount, meme_coin=meme_coin, coin_count=coin_count)
+    commission = swap_commission(amount)
+    await state.update_data(
+        swap_amount=amount,
+        meme_coin=meme_coin,
+        coin_count=coin_count,
+        quote=token_pairs,
+        quote_fetched_at=quote_fetched_at
+    )
     try:
         await message.answer(
             i18n.confirm.swap.message(
@@ -108,29 +159,43 @@ async def confirm_swap(
         swap_amount = data["swap_amount"]
         meme_coin = data["meme_coin"]
         coin_count = data["coin_count"]
-        commission = swap_amount * 0.02 if swap_amount <= 100 else swap_amount * 0.01
+        commission = swap_commission(swap_amount)
         swap_amount_after_commission = swap_amount - commission
         fee_wallet = get_config(MemeCoinConfig, "meme_coin").fee_wallet
-        tx_hash = await initiate_swap(
-            amount=swap_amount_after_commission,
-            meme_coin=meme_coin,
-            solana_wallet=solana_wallet,
-            commission=commission,
-            fee_wallet=fee_wallet
-        )
-        await log_transaction(
-            user_id=user_id,
-            solana_wallet=solana_wallet,
-            amount_in=str(swap_amount),
-            commission_amount=str(commission),
-            operation_type="swap",
-            status="swap_completed",
-            solana_tx_hash=tx_hash
-        )
+
+        async def execute_swap():
+            tx_hash = await initiate_swap(
+                amount=swap_amount_after_commission,
+                meme_coin=meme_coin,
+                solana_wallet=solana_wallet,
+                commission=commission,
+                fee_wallet=fee_wallet,
+                quote=data.get("quote"),
+                quote_fetched_at=data.get("quote_fetched_at")
+            )
+            await log_transaction(
+                user_id=user_id,
+                solana_wallet=solana_wallet,
+                amount_in=swap_amount,
+                commission_amount=commission,
+                operation_type="swap",
+                status="swap_completed",
+                solana_tx_hash=tx_hash,
+                wait=False
+            )
+            return {"tx_hash": tx_hash}
+
+        # A double tap on the button must not swap twice: key on the confirmation message
+        result, duplicate = await run_once(user_id, "confirm_swap", query.message.message_id, execute_swap)
+        if duplicate and result is None:
+            await query.answer()
+            return
         await query.message.edit_text(
             i18n.swap.completed.message(coin_count=coin_count, meme_coin="MORI")
         )
         await state.clear()
+    except CircuitOpenError:
+        await query.answer(i18n.service.unavailable.message(), show_alert=True)
     except TelegramBadRequest:
         await query.answer()
 
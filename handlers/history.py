@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.types import Message, CallbackQuery
+from aiogram.exceptions import TelegramBadRequest
+from fluentogram import TranslatorRunner
+from fluentogram.exceptions import KeyNotFoundError
+
+from keyboards.keyboards import history_summary, history_pagination
+from utils.db import get_transaction_history, get_user_summary, MICRO_UNITS
+
+history_router = Router()
+
+HISTORY_PAGE_SIZE = 5
+EPOCH = datetime(1970, 1, 1)
+
+def format_amount(micro_units: int) -> str:
+    return f"{(micro_units or 0) / MICRO_UNITS:.2f}"
+
+# Callback data has to fit in 64 bytes: history:<direction>:<created_at in µs>:<id>
+def encode_cursor(direction: str, row: dict) -> str:
+    return f"history:{direction}:{(row['created_at'] - EPOCH) // timedelta(microseconds=1)}:{row['id']}"
+
+def decode_cursor(data: str):
+    _, direction, created_us, row_id = data.split(":")
+    return direction, (EPOCH + timedelta(microseconds=int(created_us)), int(row_id))
+
+def format_entry(i18n: TranslatorRunner, row: dict) -> str:
+    try:
+        status = i18n.get(f"history-status-{row['status']}")
+    except KeyNotFoundError:
+        status = row["status"]
+    return i18n.get(
+        f"history-entry-{row['operation_type']}",
+        date=row["created_at"].strftime("%d.%m.%Y %H:%M"),
+        amount=format_amount(row["amount_in"]),
+        status=status
+    )
+
+def summary_text(i18n: TranslatorRunner, summary: dict) -> str:
+    return i18n.history.summary.message(
+        bridged=format_amount(summary["bridged_amount"]),
+        bridge_count=summary["bridge_count"],
+        swapped=format_amount(summary["swapped_amount"]),
+        swap_count=summary["swap_count"],
+        commission=format_amount(summary["commission_amount"])
+    )
+
+async def history_page(i18n: TranslatorRunner, user_id: int, cursor: tuple = None, newer: bool = False):
+    rows, has_more = await get_transaction_history(user_id, HISTORY_PAGE_SIZE, cursor, newer)
+    if not rows and cursor is not None:
+        # Nothing past the cursor any more (e.g. archived); start over from the newest
+        return await history_page(i18n, user_id)
+    if not rows:
+        return i18n.history.empty.message(), None
+    if cursor is None:
+        has_newer, has_older = False, has_more
+    elif newer:
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = True, has_more
+    text = i18n.history.page.message(entries="\n".join(format_entry(i18n, row) for row in rows))
+    markup = history_pagination(
+        i18n,
+        newer=encode_cursor("newer", rows[0]) if has_newer else None,
+        older=encode_cursor("older", rows[-1]) if has_older else None
+    )
+    return text, markup
+
+@history_router.message(Command("history"))
+async def history_command(
+        message: Message,
+        i18n: TranslatorRunner
+):
+    summary = await get_user_summary(message.from_user.id)
+    if summary:
+        await message.answer(summary_text(i18n, summary), reply_markup=history_summary(i18n))
+        return
+    # No completed operations yet; pending or failed ones may still be listed
+    text, markup = await history_page(i18n, message.from_user.id)
+    await message.answer(text, reply_markup=markup)
+
+@history_router.callback_query(F.data == "history:summary")
+async def history_summary_callback(
+        query: CallbackQuery,
+        i18n: TranslatorRunner
+):
+    try:
+        summary = await get_user_summary(query.from_user.id)
+        if not summary:
+            await query.answer(i18n.history.empty.message())
+            return
+        await query.message.edit_text(summary_text(i18n, summary), reply_markup=history_summary(i18n))
+    except TelegramBadRequest:
+        await query.answer()
+
+@history_router.callback_query(F.data == "history:page")
+async def history_first_page(
+        query: CallbackQuery,
+        i18n: TranslatorRunner
+):
+    try:
+        text, markup = await history_page(i18n, query.from_user.id)
+        await query.message.edit_text(text, reply_markup=markup)
+    except TelegramBadRequest:
+        await query.answer()
+
+@history_router.callback_query(F.data.startswith("history:older:") | F.data.startswith("history:newer:"))
+async def history_next_page(
+        query: CallbackQuery,
+        i18n: TranslatorRunner
+):
+    try:
+        direction, cursor = decode_cursor(query.data)
+        text, markup = await history_page(i18n, query.from_user.id, cursor, newer=direction == "newer")
+        await query.message.edit_text(text, reply_markup=markup)
+    except TelegramBadRequest:
+        await query.answer()
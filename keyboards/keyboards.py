@@ -49,3 +49,25 @@ def swap_confirm(i18n: TranslatorRunner) -> InlineKeyboardMarkup:
     builder.row(InlineKeyboardButton(text=i18n.cancel.button(), callback_data="cancel"))
     
     return builder.as_markup()
+
+def history_summary(i18n: TranslatorRunner) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    
+    builder.row(InlineKeyboardButton(text=i18n.history.transactions.button(), callback_data="history:page"))
+    
+    return builder.as_markup()
+
+def history_pagination(i18n: TranslatorRunner, newer: str = None, older: str = None) -> InlineKeyboardMarkup:
+    # newer/older are ready callback data carrying the keyset cursor, or None at either end
+    builder = InlineKeyboardBuilder()
+    
+    buttons = []
+    if newer:
+        buttons.append(InlineKeyboardButton(text=i18n.history.newer.button(), callback_data=newer))
+    if older:
+        buttons.append(InlineKeyboardButton(text=i18n.history.older.button(), callback_data=older))
+    if buttons:
+        builder.row(*buttons)
+    builder.row(InlineKeyboardButton(text=i18n.history.summary.button(), callback_data="history:summary"))
+    
+    return builder.as_markup()
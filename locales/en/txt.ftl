@@ -7,6 +7,7 @@ enter-solana-wallet-message = Enter your Solana wallet address to receive USDC.
 invalid-solana-wallet-message = Invalid Solana wallet address.
 enter-usdt-amount-message = Enter the amount of USDT to bridge.
 invalid-amount-message = Invalid amount. Enter a number greater than 0.
+swap-min-amount-message = The minimum swap is { $min_amount } USDC after the bot fee.
 confirm-bridge-message = Send {amount} USDT to Rhino.fi address: {address}\nReceive: USDC on {solana_wallet}.
 sent-button = Sent
 cancel-button = Cancel
@@ -25,6 +26,7 @@ confirm-swap-message = Confirm:\n- {amount} USDC → {meme_coin}\n- Bot fee: {co
 confirm-swap-button = Confirm swap
 swap-completed-message = Swap completed!
 swap-canceled-message = Swap canceled.
+service-unavailable-message = Service is temporarily unavailable. Please try again in a minute.
 bridge-failed-message = Bridge failed. Try again or contact support.
 enter-ton-wallet-message = Please enter your TON wallet address.
 invalid-ton-wallet-message = Invalid TON wallet address. Please try again.
@@ -34,3 +36,20 @@ confirm-bridge-message = Вы отправите: { $amount } USDT
 bridge-completed-message = USDC получены на Solana: { $amount_out } USDC на { $solana_wallet }
     Подтвердите своп на $MORI
 connect-wallet-button = Подключить кошелек
+history-summary-message = Your totals:
+    - Bridged: { $bridged } USDT ({ $bridge_count } bridges)
+    - Swapped: { $swapped } USDC ({ $swap_count } swaps)
+    - Bot fees: { $commission } USDC
+history-page-message = Your transactions:
+    { $entries }
+history-empty-message = You have no swaps or bridges yet.
+history-entry-bridge = { $date } · Bridge { $amount } USDT · { $status }
+history-entry-swap = { $date } · Swap { $amount } USDC · { $status }
+history-status-pending = pending
+history-status-bridge_completed = completed
+history-status-failed_bridge = failed
+history-status-swap_completed = completed
+history-transactions-button = Transactions
+history-newer-button = ← Newer
+history-older-button = Older →
+history-summary-button = Totals
@@ -7,6 +7,7 @@ enter-solana-wallet-message = Введите Solana-кошелек для пол
 invalid-solana-wallet-message = Неверный адрес Solana-кошелька.
 enter-usdt-amount-message = Введите сумму USDT для бриджа.
 invalid-amount-message = Неверная сумма. Введите число больше 0.
+swap-min-amount-message = Минимальная сумма свопа — { $min_amount } USDC после комиссии бота.
 confirm-bridge-message = Отправьте {amount} USDT на адрес Rhino.fi: {address}\nПолучение: USDC на {solana_wallet}.
 sent-button = Отправлено
 cancel-button = Отмена
@@ -25,6 +26,7 @@ confirm-swap-message = Подтвердите:\n- {amount} USDC → {meme_coin}\
 confirm-swap-button = Подтвердить своп
 swap-completed-message = Своп завершен!
 swap-canceled-message = Своп отменен.
+service-unavailable-message = Сервис временно недоступен. Попробуйте через минуту.
 bridge-failed-message = Бридж не удался. Попробуйте снова или обратитесь в поддержку.
 enter-ton-wallet-message = Введите адрес воего TON кошелька.
 invalid-ton-wallet-message = Неверный TON кошелёк.
@@ -34,3 +36,20 @@ confirm-bridge-message = Вы отправите: { $amount } USDT
 bridge-completed-message = USDC получены на Solana: { $amount_out } USDC на { $solana_wallet }
     Подтвердите своп на $MORI
 connect-wallet-button = Подключить кошелек
+history-summary-message = Ваши итоги:
+    - Бридж: { $bridged } USDT ({ $bridge_count } шт.)
+    - Свопы: { $swapped } USDC ({ $swap_count } шт.)
+    - Комиссия бота: { $commission } USDC
+history-page-message = Ваши транзакции:
+    { $entries }
+history-empty-message = У вас пока нет свопов и бриджей.
+history-entry-bridge = { $date } · Бридж { $amount } USDT · { $status }
+history-entry-swap = { $date } · Своп { $amount } USDC · { $status }
+history-status-pending = в обработке
+history-status-bridge_completed = завершен
+history-status-failed_bridge = ошибка
+history-status-swap_completed = завершен
+history-transactions-button = Транзакции
+history-newer-button = ← Новее
+history-older-button = Старше →
+history-summary-button = Итоги
@@ -0,0 +1,92 @@
+import hmac
+import logging
+import time
+from collections import OrderedDict
+from aiohttp import web
+
+from config import BridgeCallbackConfig
+from utils.db import get_pending_bridge_by_tx_id
+from utils.poller import BridgePoller
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Callback-Secret"
+
+class BridgeCallbackReceiver:
+    """
+    Embedded HTTP endpoint for pushed bridge status updates.
+
+    Accepts JSON bodies shaped like check_bridge_status() results plus the
+    quote id ({"quote_id", "status", "amount_out", "solana_tx_hash"}) and
+    applies them with the same transition logic as the poller.
+    """
+
+    def __init__(self, poller: BridgePoller, config: BridgeCallbackConfig, dedup_size: int = 10_000, dedup_ttl: float = 3600):
+        self.poller = poller
+        self.config = config
+        self._dedup_size = dedup_size
+        self._dedup_ttl = dedup_ttl
+        self._seen = OrderedDict()
+        self._runner = None
+
+    def _is_duplicate(self, quote_id: str, status: str) -> bool:
+        now = time.monotonic()
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if len(self._seen) <= self._dedup_size and now - seen_at < self._dedup_ttl:
+                break
+            self._seen.pop(key)
+        key = (quote_id, status)
+        if key in self._seen:
+            return True
+        self._seen[key] = now
+        return False
+
+    async def handle(self, request: web.Request) -> web.Response:
+        secret = self.config.secret.get_secret_value()
+        if not secret or not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            logger.warning(f"Rejected bridge callback from {request.remote}: bad secret")
+            return web.Response(status=401)
+        try:
+            payload = await request.json()
+            quote_id = payload["quote_id"]
+            status_info = {
+                "status": str(payload.get("status", "pending")).lower(),
+                "amount_out": payload.get("amount_out"),
+                "solana_tx_hash": payload.get("solana_tx_hash")
+            }
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Malformed bridge callback: {e}")
+            return web.Response(status=400)
+
+        if self._is_duplicate(quote_id, status_info["status"]):
+            logger.debug(f"Duplicate bridge callback for {quote_id} ({status_info['status']})")
+            return web.Response(status=200)
+
+        tx = await get_pending_bridge_by_tx_id(quote_id)
+        if not tx:
+            logger.debug(f"Bridge callback for {quote_id} has no pending transaction")
+            return web.Response(status=200)
+        try:
+            await self.poller.apply_status(tx, status_info)
+        except Exception as e:
+            logger.error(f"Failed to apply bridge callback for {quote_id}: {e}")
+            # Let the sender retry; the reconciliation sweep will also pick it up
+            self._seen.pop((quote_id, status_info["status"]), None)
+            return web.Response(status=500)
+        logger.info(f"Applied bridge callback for {quote_id}: {status_info['status']}")
+        return web.Response(status=200)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(self.config.path, self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.config.host, self.config.port)
+        await site.start()
+        logger.info(f"Bridge callback receiver listening on {self.config.host}:{self.config.port}{self.config.path}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
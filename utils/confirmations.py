@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Coroutine
+
+from config import get_config, ConfirmationConfig
+
+logger = logging.getLogger(__name__)
+
+class ConfirmationRegistry:
+    """
+    Background jobs waiting for a wallet to confirm a TonConnect transaction.
+
+    Handlers submit the wait as a coroutine and return immediately. There is
+    at most one job per user and at most max_pending jobs overall; each job
+    applies config.timeout itself. A new job supersedes the user's previous
+    wait, which is cancelled and, unless it already called confirmed(), has
+    its on_superseded callback run.
+    On shutdown outstanding jobs get drain_timeout to finish and are then
+    cancelled; their transactions stay pending in the database and are
+    resolved by the bridge poller.
+    """
+
+    def __init__(self):
+        self._config = None
+        self._jobs = {}
+        self._on_superseded = {}
+        self._cleanups = set()
+
+    @property
+    def config(self) -> ConfirmationConfig:
+        if self._config is None:
+            self._config = get_config(ConfirmationConfig, "confirmations")
+        return self._config
+
+    @property
+    def pending(self) -> int:
+        return len(self._jobs)
+
+    def has_capacity(self, user_id: int) -> bool:
+        return user_id in self._jobs or len(self._jobs) < self.config.max_pending
+
+    def submit(
+            self,
+            user_id: int,
+            job: Coroutine,
+            on_superseded: Callable[[], Awaitable] = None
+    ) -> bool:
+        if not self.has_capacity(user_id):
+            logger.warning(f"Too many pending confirmations ({len(self._jobs)}), rejecting user {user_id}")
+            job.close()
+            return False
+        self.cancel(user_id, superseded=True)
+        task = asyncio.create_task(job)
+        self._jobs[user_id] = task
+        if on_superseded:
+            self._on_superseded[task] = on_superseded
+        task.add_done_callback(lambda t: self._on_done(user_id, t))
+        return True
+
+    def cancel(self, user_id: int, superseded: bool = False) -> bool:
+        task = self._jobs.pop(user_id, None)
+        if task is None:
+            return False
+        task.cancel()
+        on_superseded = self._on_superseded.pop(task, None)
+        if superseded and on_superseded:
+            # Runs even if the job never started, so its transaction doesn't stay pending
+            cleanup = asyncio.create_task(on_superseded())
+            self._cleanups.add(cleanup)
+            cleanup.add_done_callback(self._on_cleanup_done)
+        logger.info(f"Cancelled pending confirmation for user {user_id}")
+        return True
+
+    def confirmed(self):
+        # Called from a job once the wallet has signed: superseding it now must not fail its transaction
+        self._on_superseded.pop(asyncio.current_task(), None)
+
+    def _on_cleanup_done(self, task: asyncio.Task):
+        self._cleanups.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Superseded confirmation cleanup failed: {task.exception()}", exc_info=task.exception())
+
+    def _on_done(self, user_id: int, task: asyncio.Task):
+        if self._jobs.get(user_id) is task:
+            del self._jobs[user_id]
+        self._on_superseded.pop(task, None)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Confirmation job for user {user_id} failed: {task.exception()}", exc_info=task.exception())
+
+    async def drain(self):
+        if self._cleanups:
+            await asyncio.gather(*self._cleanups, return_exceptions=True)
+        if not self._jobs:
+            return
+        tasks = list(self._jobs.values())
+        logger.info(f"Waiting up to {self.config.drain_timeout}s for {len(tasks)} pending confirmations")
+        _, still_pending = await asyncio.wait(tasks, timeout=self.config.drain_timeout)
+        for task in still_pending:
+            task.cancel()
+        if still_pending:
+            await asyncio.gather(*still_pending, return_exceptions=True)
+            logger.info(f"Left {len(still_pending)} unconfirmed transactions pending for the poller")
+        self._jobs.clear()
+        self._on_superseded.clear()
+
+confirmation_registry = ConfirmationRegistry()
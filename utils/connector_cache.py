@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from tonutils.tonconnect import TonConnect
+from tonutils.tonconnect.utils.exceptions import TonConnectError
+
+from config import TonConnect as TonConnectConfig
+
+logger = logging.getLogger(__name__)
+
+def approx_size(obj) -> int:
+    # Shallow size of the object plus its attributes; good enough to watch the trend
+    size = sys.getsizeof(obj)
+    for value in getattr(obj, "__dict__", {}).values():
+        size += sys.getsizeof(value)
+    return size
+
+class CachedTonConnect:
+    """
+    Facade over the TonConnect object used by AiogramTonConnectMiddleware
+    that bounds how many connectors it keeps.
+
+    TonConnect holds every connector it ever created, each with its own
+    bridge listener, for the life of the process. This tracks them in
+    last-used order and evicts past connector_cache_size or after
+    connector_idle_ttl of disuse; a connector with a wallet request still
+    pending is kept. A connector created again after eviction is restored
+    from storage right away, so the user comes back connected. Everything
+    else is delegated to the wrapped object.
+    """
+
+    def __init__(self, tonconnect: TonConnect, config: TonConnectConfig):
+        self.tonconnect = tonconnect
+        self.config = config
+        self._last_used = OrderedDict()
+        self._sweeper = None
+        self.evictions = 0
+        self.restores = 0
+
+    def __getattr__(self, name):
+        return getattr(self.tonconnect, name)
+
+    async def get_connector(self, user_id: int):
+        connector = await self.tonconnect.get_connector(user_id)
+        if connector is not None:
+            self._touch(user_id)
+        return connector
+
+    async def create_connector(self, user_id: int):
+        connector = await self.tonconnect.create_connector(user_id)
+        # The user may have been evicted earlier: bring back the session kept in storage
+        with suppress(TonConnectError):
+            await connector.restore_connection()
+            if connector.connected:
+                self.restores += 1
+        self._touch(user_id)
+        return connector
+
+    async def init_connector(self, user_id: int = None):
+        connector = await self.tonconnect.init_connector(user_id)
+        self._touch(connector.user_id)
+        return connector
+
+    def _touch(self, user_id: int):
+        self._last_used[user_id] = time.monotonic()
+        self._last_used.move_to_end(user_id)
+        # Oldest first, never the connector just handed out
+        for user_id in list(self._last_used)[:-1]:
+            if len(self._last_used) <= self.config.connector_cache_size:
+                break
+            self._evict(user_id)
+
+    def _evict(self, user_id: int) -> bool:
+        connectors = self.tonconnect._connectors
+        connector = connectors.get(user_id)
+        if connector is not None and connector.bridge is not None and connector.bridge.pending_requests:
+            # A bridge job is waiting on this connector's listener; try again once it's answered
+            self._last_used[user_id] = time.monotonic()
+            self._last_used.move_to_end(user_id)
+            return False
+        del self._last_used[user_id]
+        # tonutils has no public way to forget a connector, so it is dropped from its registry here
+        if connector is not None:
+            del connectors[user_id]
+            asyncio.create_task(connector.pause())
+        self.evictions += 1
+        return True
+
+    def evict_idle(self) -> int:
+        # Entries are in last-used order, so stop at the first one still in use
+        deadline = time.monotonic() - self.config.connector_idle_ttl
+        evicted = 0
+        for user_id, last_used in list(self._last_used.items()):
+            if last_used >= deadline:
+                break
+            evicted += self._evict(user_id)
+        return evicted
+
+    def stats(self) -> dict:
+        connectors = self.tonconnect._connectors
+        return {
+            "size": len(self._last_used),
+            "evictions": self.evictions,
+            "restores": self.restores,
+            "approx_bytes": sum(approx_size(connectors[user_id]) for user_id in self._last_used if user_id in connectors)
+        }
+
+    def start(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        self._last_used.clear()
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.config.connector_stats_interval)
+            self.evict_idle()
+            logger.info(f"TonConnect connector cache stats: {self.stats()}")
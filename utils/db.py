@@ -1,61 +1,162 @@
+import asyncio
 import asyncpg
 import redis.asyncio as redis
 import logging
-from config import get_config, DbConfig
-from pytonconnect.storage import IStorage
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from config import get_config, DbConfig, RedisConfig
+from decimal import Decimal
+from tonutils.tonconnect.storage import IStorage
+from utils.migrations import run_migrations
+from utils.statements import StatementConnection, prepare_statements
 
 logger = logging.getLogger(__name__)
 
 # Глобальный пул соединений
 _pool = None
+_redis = None
+_transaction_writer = None
 
-class TcStorage(IStorage):
-    def __init__(self, chat_id: int):
-        self.chat_id = chat_id
+BRIDGE_EVENTS_CHANNEL = "bridge_events"
+
+# Amounts are stored as integers in millionths of a token (USDT/USDC micro-units)
+MICRO_UNITS = 10**6
+
+def to_micro_units(amount) -> int:
+    return int((Decimal(str(amount)) * MICRO_UNITS).to_integral_value())
+
+def _optional_int(value):
+    return int(value) if value not in (None, "") else None
+
+async def redis_start():
+    global _redis
+    config = get_config(RedisConfig, "redis")
+    pool = redis.ConnectionPool(
+        host=config.host,
+        port=config.port,
+        db=config.db,
+        max_connections=config.max_connections,
+        socket_timeout=config.socket_timeout,
+        socket_connect_timeout=config.socket_connect_timeout,
+        health_check_interval=config.health_check_interval
+    )
+    _redis = redis.Redis(connection_pool=pool)
+    await _redis.ping()
+    logger.info(f"Redis pool initialized for {config.host}:{config.port}/{config.db}")
+    return _redis
+
+def get_redis() -> redis.Redis:
+    # Process-wide client backed by one connection pool; every Redis helper shares it
+    if _redis is None:
+        raise Exception("Redis not initialized")
+    return _redis
+
+async def redis_close():
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        await _redis.connection_pool.disconnect()
+        _redis = None
+        logger.info("Redis pool closed")
+
+# Redis keys that make up a user's profile, fetched together with one MGET
+PROFILE_KEYS = {
+    "jetton_wallet": "config:{user_id}:jetton_wallet",
+    "bridge_wallet": "config:{user_id}:bridge_wallet",
+    "last_solana_wallet": "config:{user_id}:last_solana_wallet",
+    "wallet_address": "tc:{user_id}:wallet_address"
+}
+# Written outside this bot, so nothing here can invalidate them; a profile missing
+# any of them isn't cached and picks the value up as soon as it is set
+REQUIRED_PROFILE_KEYS = ("jetton_wallet", "bridge_wallet", "wallet_address")
+
+class ProfileCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int):
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def set(self, user_id: int, profile: dict):
+        self._entries[user_id] = (time.monotonic() + self.ttl, profile)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+_profile_cache = None
+
+def get_profile_cache() -> ProfileCache:
+    global _profile_cache
+    if _profile_cache is None:
+        config = get_config(RedisConfig, "redis")
+        _profile_cache = ProfileCache(config.profile_cache_ttl, config.profile_cache_size)
+    return _profile_cache
 
+async def get_user_profile(user_id: int) -> dict:
+    cache = get_profile_cache()
+    profile = cache.get(user_id)
+    if profile is not None:
+        return profile
+    values = await get_redis().mget([key.format(user_id=user_id) for key in PROFILE_KEYS.values()])
+    profile = {name: value.decode() if value else None for name, value in zip(PROFILE_KEYS, values)}
+    if all(profile[name] for name in REQUIRED_PROFILE_KEYS):
+        cache.set(user_id, profile)
+    return profile
+
+def invalidate_user_profile(user_id: int):
+    get_profile_cache().invalidate(user_id)
+
+class TcStorage(IStorage):
+    # One storage shared by every connector: TonConnect prefixes the keys it
+    # passes with the user id, so they land under tc:{user_id}:...
     def _get_key(self, key: str):
-        return f"tc:{self.chat_id}:{key}"
+        return f"tc:{key}"
 
     async def set_item(self, key: str, value: str):
         try:
-            r = redis.Redis(host='redis', port=6379, db=0)
-            try:
-                await r.set(self._get_key(key), value)
-                logger.debug(f"Set item {key} for chat {self.chat_id}")
-            finally:
-                await r.close()
+            r = get_redis()
+            await r.set(self._get_key(key), value)
+            logger.debug(f"Set item {key}")
         except Exception as e:
-            logger.error(f"Failed to set item {key} for chat {self.chat_id}: {e}")
+            logger.error(f"Failed to set item {key}: {e}")
             raise
 
     async def get_item(self, key: str, default_value: str = None):
         try:
-            r = redis.Redis(host='redis', port=6379, db=0)
-            try:
-                value = await r.get(self._get_key(key))
-                return value.decode() if value else default_value
-            finally:
-                await r.close()
+            r = get_redis()
+            value = await r.get(self._get_key(key))
+            return value.decode() if value else default_value
         except Exception as e:
-            logger.error(f"Failed to get item {key} for chat {self.chat_id}: {e}")
+            logger.error(f"Failed to get item {key}: {e}")
             raise
 
     async def remove_item(self, key: str):
         try:
-            r = redis.Redis(host='redis', port=6379, db=0)
-            try:
-                await r.delete(self._get_key(key))
-                logger.debug(f"Removed item {key} for chat {self.chat_id}")
-            finally:
-                await r.close()
+            r = get_redis()
+            await r.delete(self._get_key(key))
+            logger.debug(f"Removed item {key}")
         except Exception as e:
-            logger.error(f"Failed to remove item {key} for chat {self.chat_id}: {e}")
+            logger.error(f"Failed to remove item {key}: {e}")
             raise
 
 async def get_wallet_by_user_id(user_id: int):
     try:
-        storage = TcStorage(user_id)
-        address = await storage.get_item("wallet_address")
+        address = (await get_user_profile(user_id))["wallet_address"]
         if address:
             return {"address": address}
         return None
@@ -65,141 +166,425 @@ async def get_wallet_by_user_id(user_id: int):
 
 async def get_config_by_user_id(user_id: int):
     try:
-        r = redis.Redis(host='redis', port=6379, db=0)
-        try:
-            jetton_wallet = await r.get(f"config:{user_id}:jetton_wallet")
-            bridge_wallet = await r.get(f"config:{user_id}:bridge_wallet")
-            if jetton_wallet and bridge_wallet:
-                return {
-                    "jetton_wallet": jetton_wallet.decode(),
-                    "bridge_wallet": bridge_wallet.decode()
-                }
-            return None
-        finally:
-            await r.close()
+        profile = await get_user_profile(user_id)
+        if profile["jetton_wallet"] and profile["bridge_wallet"]:
+            return {
+                "jetton_wallet": profile["jetton_wallet"],
+                "bridge_wallet": profile["bridge_wallet"]
+            }
+        return None
     except Exception as e:
         logger.error(f"Failed to get config for user {user_id}: {e}")
         return None
 
+class PoolStats:
+    def __init__(self):
+        self.acquires = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def acquired(self, wait: float):
+        self.acquires += 1
+        self.in_use += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def released(self):
+        self.in_use -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "size": _pool.get_size() if _pool else 0,
+            "idle": _pool.get_idle_size() if _pool else 0,
+            "in_use": self.in_use,
+            "max_in_use": self.max_in_use,
+            "acquires": self.acquires,
+            "avg_wait_ms": round(self.total_wait / self.acquires * 1000, 2) if self.acquires else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2)
+        }
+
+pool_stats = PoolStats()
+_stats_task = None
+
+@asynccontextmanager
+async def acquire():
+    # Pool acquire that records how long callers wait for a connection
+    started = time.monotonic()
+    async with _pool.acquire() as conn:
+        pool_stats.acquired(time.monotonic() - started)
+        try:
+            yield conn
+        finally:
+            pool_stats.released()
+
+async def _report_pool_stats(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(f"Database pool stats: {pool_stats.snapshot()}")
+
+async def _connect(config: DbConfig, **kwargs) -> asyncpg.Connection:
+    return await asyncpg.connect(
+        user=config.user,
+        password=config.password.get_secret_value(),
+        database=config.database,
+        host=config.host,
+        port=config.port,
+        **kwargs
+    )
+
 async def db_start():
-    global _pool
+    global _pool, _stats_task
     try:
         config = get_config(DbConfig, "db")
+        # Migrate before the pool exists so its connections prepare against the final schema
+        conn = await _connect(config)
+        try:
+            await run_migrations(conn)
+        finally:
+            await conn.close()
         _pool = await asyncpg.create_pool(
             user=config.user,
             password=config.password.get_secret_value(),
             database=config.database,
             host=config.host,
-            port=config.port
+            port=config.port,
+            min_size=config.min_size,
+            max_size=config.max_size,
+            max_queries=config.max_queries,
+            max_inactive_connection_lifetime=config.max_inactive_connection_lifetime,
+            statement_cache_size=config.statement_cache_size,
+            command_timeout=config.command_timeout,
+            connection_class=StatementConnection,
+            init=prepare_statements if config.prepare_statements else None
         )
-        async with _pool.acquire() as conn:
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id SERIAL PRIMARY KEY,
-                    user_id BIGINT NOT NULL,
-                    solana_wallet TEXT NOT NULL,
-                    amount_in TEXT NOT NULL,
-                    commission_amount TEXT NOT NULL,
-                    operation_type TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    tx_id TEXT,
-                    solana_tx_hash TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-                CREATE INDEX IF NOT EXISTS idx_transactions_status_op ON transactions (status, operation_type);
-                CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions (user_id);
-            ''')
-        logger.info("Database initialized successfully")
+        _stats_task = asyncio.create_task(_report_pool_stats(config.stats_interval))
+        logger.info(f"Database initialized successfully (pool {config.min_size}-{config.max_size})")
         return _pool
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         return None
 
+async def db_close():
+    global _pool, _stats_task
+    if _stats_task:
+        _stats_task.cancel()
+        _stats_task = None
+    if _pool:
+        await _pool.close()
+        _pool = None
+        logger.info("Database pool closed")
+
 async def log_transaction(
         user_id: int, 
         solana_wallet: str, 
-        amount_in: str, 
-        commission_amount: str, 
+        amount_in: float, 
+        commission_amount: float, 
         operation_type: str, 
         status: str, 
         solana_tx_hash: str = 'none',
-        tx_id: str = 'none'):
+        tx_id: str = 'none',
+        wait: bool = True) -> int:
+    # With write-behind enabled the row is queued durably and inserted in a batch;
+    # wait=False returns once it is queued, without the id
+    if _transaction_writer is not None:
+        row = {
+            "user_id": user_id,
+            "solana_wallet": solana_wallet,
+            "amount_in": to_micro_units(amount_in),
+            "commission_amount": to_micro_units(commission_amount),
+            "operation_type": operation_type,
+            "status": status,
+            "tx_id": tx_id,
+            "solana_tx_hash": solana_tx_hash
+        }
+        return await _transaction_writer.submit(row, wait=wait)
     if not _pool:
         logger.error("No database pool available")
         raise Exception("Database not initialized")
     try:
-        async with _pool.acquire() as conn:
-            await conn.execute(
-                '''
-                INSERT INTO transactions (user_id, solana_wallet, amount_in, commission_amount, operation_type, status, tx_id, solana_tx_hash)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                ''',
-                user_id, solana_wallet, amount_in, commission_amount, operation_type, status, tx_id, solana_tx_hash
+        async with acquire() as conn:
+            transaction_id = await conn.fetchval_statement(
+                "log_transaction",
+                user_id, solana_wallet, to_micro_units(amount_in), to_micro_units(commission_amount),
+                operation_type, status, tx_id, solana_tx_hash
             )
-        logger.info(f"Logged transaction for user {user_id}, operation {operation_type}, status {status}, tx_id {tx_id}")
+        logger.info(f"Logged transaction {transaction_id} for user {user_id}, operation {operation_type}, status {status}, tx_id {tx_id}")
+        return transaction_id
     except Exception as e:
         logger.error(f"Failed to log transaction: {e}")
         raise
 
-async def get_pending_bridges():
+async def get_db_time() -> datetime:
+    # The database's LOCALTIMESTAMP, the clock created_at defaults to
+    async with acquire() as conn:
+        return await conn.fetchval("SELECT LOCALTIMESTAMP")
+
+def set_transaction_writer(writer):
+    global _transaction_writer
+    _transaction_writer = writer
+
+async def insert_transaction_batch(rows: list) -> dict:
+    """
+    Insert write-behind rows (dicts with log_ref and created_at) in one statement.
+
+    Replayed rows that are already stored are matched on (log_ref, created_at),
+    so the result always maps every log_ref to its transaction id.
+    """
+    if not _pool:
+        logger.error("No database pool available")
+        raise Exception("Database not initialized")
+    columns = ("user_id", "solana_wallet", "amount_in", "commission_amount", "operation_type", "status",
+               "tx_id", "solana_tx_hash", "created_at", "log_ref")
+    async with acquire() as conn:
+        records = await conn.fetch_statement("log_transactions_batch", *([row[column] for row in rows] for column in columns))
+    logger.info(f"Logged {len(records)} transactions in one batch")
+    return {record["log_ref"]: record["id"] for record in records}
+
+def _bridge_row(row) -> dict:
+    return {
+        "id": row["id"],
+        "user_id": row["user_id"],
+        "solana_wallet": row["solana_wallet"],
+        "tx_id": row["tx_id"],
+        "created_at": row["created_at"],
+        "check_attempts": row["check_attempts"]
+    }
+
+async def get_pending_bridges(user_id: int = None, due_only: bool = False):
     if not _pool:
         logger.error("No database pool available")
         return []
+    query = '''
+        SELECT id, user_id, solana_wallet, tx_id, created_at, check_attempts FROM transactions
+        WHERE status = 'pending' AND operation_type = 'bridge'
+    '''
+    args = []
+    if user_id is not None:
+        query += " AND user_id = $1"
+        args.append(user_id)
+    if due_only:
+        query += " AND next_check_at <= CURRENT_TIMESTAMP"
     try:
-        async with _pool.acquire() as conn:
-            rows = await conn.fetch("SELECT id, user_id, solana_wallet, tx_id, created_at FROM transactions WHERE status = 'pending' AND operation_type = 'bridge'")
+        async with acquire() as conn:
+            if due_only and user_id is None:
+                # The poller's fallback when rows are not claimed runs every cycle
+                rows = await conn.fetch_statement("pending_bridges_due")
+            else:
+                rows = await conn.fetch(query, *args)
         logger.debug(f"Fetched {len(rows)} pending bridges")
-        return [{"id": row["id"], "user_id": row["user_id"], "solana_wallet": row["solana_wallet"], "tx_id": row["tx_id"], "created_at": row["created_at"]} for row in rows]
+        return [_bridge_row(row) for row in rows]
     except Exception as e:
         logger.error(f"Failed to fetch pending bridges: {e}")
         return []
 
+async def get_pending_bridge_by_tx_id(tx_id: str):
+    if not _pool:
+        logger.error("No database pool available")
+        return None
+    try:
+        async with acquire() as conn:
+            row = await conn.fetchrow_statement("pending_bridge_by_tx_id", tx_id)
+        return _bridge_row(row) if row else None
+    except Exception as e:
+        logger.error(f"Failed to fetch pending bridge {tx_id}: {e}")
+        return None
+
+# Leases due bridges to one poller replica; rows held by other replicas are skipped
+# and leases of a crashed replica become claimable again once they expire
+async def claim_pending_bridges(worker_id: str, lease_seconds: float, limit: int):
+    if not _pool:
+        logger.error("No database pool available")
+        return []
+    try:
+        async with acquire() as conn:
+            rows = await conn.fetch_statement("claim_pending_bridges", worker_id, lease_seconds, limit)
+        logger.debug(f"Worker {worker_id} claimed {len(rows)} pending bridges")
+        return [_bridge_row(row) for row in rows]
+    except Exception as e:
+        logger.error(f"Failed to claim pending bridges: {e}")
+        return []
+
+async def get_next_bridge_check_at():
+    if not _pool:
+        logger.error("No database pool available")
+        return None
+    try:
+        async with acquire() as conn:
+            return await conn.fetchval_statement("next_bridge_check_at")
+    except Exception as e:
+        logger.error(f"Failed to fetch next bridge check time: {e}")
+        return None
+
+async def listen_bridge_events(callback) -> asyncpg.Connection:
+    # LISTEN needs a connection of its own: a pooled one would be released after each query
+    conn = await _connect(get_config(DbConfig, "db"))
+    await conn.add_listener(BRIDGE_EVENTS_CHANNEL, callback)
+    logger.info(f"Listening for {BRIDGE_EVENTS_CHANNEL} notifications")
+    return conn
+
+async def fail_expired_bridges(max_age_minutes: int):
+    if not _pool:
+        logger.error("No database pool available")
+        return []
+    try:
+        async with acquire() as conn:
+            rows = await conn.fetch_statement("fail_expired_bridges", max_age_minutes)
+        if rows:
+            logger.info(f"Expired {len(rows)} pending bridges older than {max_age_minutes} minutes")
+        return [dict(row) for row in rows]
+    except Exception as e:
+        logger.error(f"Failed to expire pending bridges: {e}")
+        return []
+
+async def apply_bridge_updates(transitions: list, reschedules: list):
+    """
+    Apply a poll cycle's results in one statement (and so one transaction).
+
+    transitions: dicts with id, status, amount_out (micro-units) and solana_tx_hash
+    reschedules: dicts with id, check_attempts and delay (seconds)
+
+    Only rows that are still pending are touched; the rows that actually
+    changed status are returned so the caller can notify their users.
+    """
+    if not _pool:
+        logger.error("No database pool available")
+        raise Exception("Database not initialized")
+    if not transitions and not reschedules:
+        return []
+    try:
+        async with acquire() as conn:
+            rows = await conn.fetch_statement(
+                "apply_bridge_updates",
+                [u["id"] for u in transitions],
+                [u["status"] for u in transitions],
+                [u.get("amount_out") for u in transitions],
+                [u.get("solana_tx_hash") for u in transitions],
+                [r["id"] for r in reschedules],
+                [r["check_attempts"] for r in reschedules],
+                [float(r["delay"]) for r in reschedules]
+            )
+        logger.info(f"Applied {len(rows)} bridge transitions and {len(reschedules)} reschedules")
+        return [dict(row) for row in rows]
+    except Exception as e:
+        logger.error(f"Failed to apply bridge updates: {e}")
+        raise
+
 async def update_status(
         transaction_id: int, 
         status: str, 
-        amount_out: str = None, 
+        amount_out: int = None, 
         solana_tx_hash: str = None
 ):
     if not _pool:
         logger.error("No database pool available")
         raise Exception("Database not initialized")
     try:
-        async with _pool.acquire() as conn:
+        async with acquire() as conn:
             await conn.execute(
                 '''
                 UPDATE transactions SET status = $1, amount_out = $2, solana_tx_hash = $3
                 WHERE id = $4
                 ''',
-                status, amount_out, solana_tx_hash, transaction_id
+                status, _optional_int(amount_out), solana_tx_hash, transaction_id
             )
         logger.info(f"Updated transaction {transaction_id} to status {status}")
     except Exception as e:
         logger.error(f"Failed to update transaction {transaction_id}: {e}")
         raise
 
+async def get_transaction_history(user_id: int, limit: int, cursor: tuple = None, newer: bool = False):
+    """
+    One page of a user's transactions, newest first, by keyset on (created_at, id).
+
+    cursor is the (created_at, id) of the last row shown: the page holds rows
+    older than it, or with newer=True the rows just newer than it. Returns
+    (rows, has_more), where has_more says whether rows exist past the page.
+    """
+    if not _pool:
+        logger.error("No database pool available")
+        return [], False
+    if cursor is None:
+        condition, order, args = "", "DESC", [user_id, limit + 1]
+    elif newer:
+        condition, order, args = "AND (created_at, id) > ($3, $4)", "ASC", [user_id, limit + 1, *cursor]
+    else:
+        condition, order, args = "AND (created_at, id) < ($3, $4)", "DESC", [user_id, limit + 1, *cursor]
+    try:
+        async with acquire() as conn:
+            rows = await conn.fetch(
+                f'''
+                SELECT id, operation_type, status, amount_in, commission_amount, amount_out, created_at
+                FROM transactions
+                WHERE user_id = $1 {condition}
+                ORDER BY created_at {order}, id {order}
+                LIMIT $2
+                ''',
+                *args
+            )
+        has_more = len(rows) > limit
+        rows = [dict(row) for row in rows[:limit]]
+        if newer:
+            rows.reverse()
+        return rows, has_more
+    except Exception as e:
+        logger.error(f"Failed to fetch history for user {user_id}: {e}")
+        return [], False
+
+async def get_user_summary(user_id: int):
+    # Maintained by the transactions_user_summary trigger, so this is a single-row lookup
+    if not _pool:
+        logger.error("No database pool available")
+        return None
+    try:
+        async with acquire() as conn:
+            row = await conn.fetchrow(
+                '''
+                SELECT bridged_amount, bridge_count, swapped_amount, swap_count, commission_amount
+                FROM user_summaries WHERE user_id = $1
+                ''',
+                user_id
+            )
+        return dict(row) if row else None
+    except Exception as e:
+        logger.error(f"Failed to fetch summary for user {user_id}: {e}")
+        return None
+
 async def set_quote_id(
         user_id: int, 
         quote_id: str
 ):
     try:
-        r = redis.Redis(host='redis', port=6379, db=0)
-        try:
-            await r.set(f"quote:{user_id}", quote_id)
-            logger.info(f"Saved quote_id {quote_id} for user {user_id}")
-        finally:
-            await r.close()
+        r = get_redis()
+        await r.set(f"quote:{user_id}", quote_id)
+        logger.info(f"Saved quote_id {quote_id} for user {user_id}")
     except Exception as e:
         logger.error(f"Failed to set quote_id for user {user_id}: {e}")
         raise
 
 async def get_quote_id(user_id: int) -> str:
     try:
-        r = redis.Redis(host='redis', port=6379, db=0)
-        try:
-            quote_id = await r.get(f"quote:{user_id}")
-            return quote_id.decode() if quote_id else None
-        finally:
-            await r.close()
+        r = get_redis()
+        quote_id = await r.get(f"quote:{user_id}")
+        return quote_id.decode() if quote_id else None
     except Exception as e:
         logger.error(f"Failed to get quote_id for user {user_id}: {e}")
         raise
+
+async def set_last_solana_wallet(user_id: int, solana_wallet: str):
+    try:
+        r = get_redis()
+        await r.set(f"config:{user_id}:last_solana_wallet", solana_wallet)
+        invalidate_user_profile(user_id)
+        logger.debug(f"Saved last Solana wallet for user {user_id}")
+    except Exception as e:
+        logger.error(f"Failed to set last Solana wallet for user {user_id}: {e}")
+
+async def get_last_solana_wallet(user_id: int) -> str:
+    try:
+        return (await get_user_profile(user_id))["last_solana_wallet"]
+    except Exception as e:
+        logger.error(f"Failed to get last Solana wallet for user {user_id}: {e}")
+        return None
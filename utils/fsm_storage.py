@@ -0,0 +1,62 @@
+import json
+import logging
+from functools import partial
+from typing import Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StorageKey, StateType
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio import Redis
+
+from config import FsmConfig
+from utils.db import get_redis
+
+logger = logging.getLogger(__name__)
+
+compact_dumps = partial(json.dumps, separators=(",", ":"), ensure_ascii=False)
+
+class FlowRedisStorage(RedisStorage):
+    """
+    RedisStorage with a TTL per state.
+
+    Setting a state also re-arms the TTL of the flow's data, so an
+    abandoned flow (state and data) is evicted by Redis once the current
+    step's TTL runs out.
+    """
+
+    def __init__(self, redis: Redis, default_ttl: int, state_ttls: dict):
+        super().__init__(
+            redis=redis,
+            state_ttl=default_ttl,
+            data_ttl=default_ttl,
+            json_dumps=compact_dumps
+        )
+        self.state_ttls = state_ttls
+
+    def ttl_for(self, state: Optional[str]) -> int:
+        return self.state_ttls.get(state, self.state_ttl)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        if state is None:
+            await super().set_state(key, None)
+            return
+        state_name = state.state if isinstance(state, State) else state
+        ttl = self.ttl_for(state_name)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self.key_builder.build(key, "state"), state_name, ex=ttl)
+            pipe.expire(self.key_builder.build(key, "data"), ttl)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        # The Redis pool is shared with the rest of the bot and closed by redis_close()
+        pass
+
+def create_fsm_storage(config: FsmConfig):
+    if config.storage == "memory":
+        return None, None
+    if config.storage != "redis":
+        raise ValueError(f"Unknown FSM storage backend: {config.storage}")
+    storage = FlowRedisStorage(get_redis(), config.default_ttl, config.state_ttls)
+    # Lock per user across replicas so updates of one flow are handled in order
+    isolation = storage.create_isolation() if config.isolate_events else None
+    logger.info(f"Using Redis FSM storage (default TTL {config.default_ttl}s)")
+    return storage, isolation
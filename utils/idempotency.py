@@ -0,0 +1,54 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Tuple
+
+from config import get_config, IdempotencyConfig
+from utils.db import get_redis
+
+logger = logging.getLogger(__name__)
+
+async def run_once(
+        user_id: int,
+        step: str,
+        key: Any,
+        func: Callable[[], Awaitable[Any]]
+) -> Tuple[Any, bool]:
+    """
+    Run func once per (user, step, key) and return (result, duplicate).
+
+    The first caller takes a short-lived Redis lock, runs func and caches its
+    JSON result. Duplicates never run func: they get the cached result, or
+    wait for the first caller up to wait_timeout and get None if it has not
+    finished (or returned nothing). A failed first call releases the lock
+    without caching, so a later retry of the step can run again.
+    """
+    config = get_config(IdempotencyConfig, "idempotency")
+    r = get_redis()
+    base_key = f"idem:{user_id}:{step}:{key}"
+    result_key = f"{base_key}:result"
+
+    cached = await r.get(result_key)
+    if cached is not None:
+        return json.loads(cached), True
+
+    if not await r.set(base_key, "1", nx=True, ex=config.lock_ttl):
+        logger.info(f"Duplicate {step} for user {user_id} ({key}), waiting for the first result")
+        deadline = time.monotonic() + config.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(config.poll_interval)
+            cached, locked = await r.mget(result_key, base_key)
+            if cached is not None:
+                return json.loads(cached), True
+            if locked is None:
+                break
+        return None, True
+
+    try:
+        result = await func()
+        if result is not None:
+            await r.set(result_key, json.dumps(result), ex=config.result_ttl)
+        return result, False
+    finally:
+        await r.delete(base_key)
@@ -1,50 +1,215 @@
 import aiohttp
+import asyncio
 import logging
-from config import get_config, MemeCoinConfig
+import time
+from config import get_config, MemeCoinConfig, JupiterConfig, ResilienceConfig
+from utils.resilience import Upstream, upstream_error
 from utils.wallet_validator import is_valid_solana_address
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+class QuoteCache:
+    """
+    Short-lived cache for Jupiter quotes.
+
+    Keys are (input mint, output mint, amount, slippage); approximate quotes
+    key on an amount bucket instead. Concurrent misses for the same key
+    share one upstream request, and the last seen price per pair is kept for
+    approximate quotes. Lookups return the quote with the wall-clock time it
+    was requested, since a hit may be up to ttl old.
+    """
+
+    def __init__(self, ttl: float, amount_bucket: int):
+        self.ttl = ttl
+        self.amount_bucket = max(amount_bucket, 1)
+        self._entries = {}
+        self._in_flight = {}
+        self._prices = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def key(self, input_mint: str, output_mint: str, amount: int, slippage_bps: int, approximate: bool = False) -> tuple:
+        # Only approximate quotes may be shared across amounts; an exact quote is for its amount alone
+        if approximate:
+            return input_mint, output_mint, "bucket", amount // self.amount_bucket, slippage_bps
+        return input_mint, output_mint, amount, slippage_bps
+
+    async def get(self, key: tuple, fetch) -> tuple:
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(in_flight)
+        self.misses += 1
+        task = asyncio.ensure_future(self._timed(fetch))
+        self._in_flight[key] = task
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            self._in_flight.pop(key, None)
+        self._store(key, result)
+        return result
+
+    @staticmethod
+    async def _timed(fetch) -> tuple:
+        # Stamped when requested: the quote is at least this old by the time anyone sees it
+        fetched_at = time.time()
+        return await fetch(), fetched_at
+
+    def _store(self, key: tuple, result: tuple):
+        now = time.monotonic()
+        if len(self._entries) > 10_000:
+            self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+        self._entries[key] = (now + self.ttl, result)
+        data = result[0]
+        in_amount, out_amount = int(data.get("inAmount") or 0), int(data.get("outAmount") or 0)
+        if in_amount:
+            self._prices[key[:2]] = (out_amount / in_amount, now)
+
+    def price(self, input_mint: str, output_mint: str, max_age: float):
+        price = self._prices.get((input_mint, output_mint))
+        if price and time.monotonic() - price[1] <= max_age:
+            return price[0]
+        return None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
 class JupiterAPI:
-    def __init__(self):
-        self.base_url = "https://quote-api.jup.ag/v6"
+    def __init__(self, config: JupiterConfig = None):
+        self._config = config
+        self._session = None
+        self._quote_cache = None
+        self._upstream = None
         self.usdc_address = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"  # USDC на Solana
 
-    async def get_token_pairs(self, output_mint: str, amount: int) -> dict:
+    @property
+    def config(self) -> JupiterConfig:
+        if self._config is None:
+            self._config = get_config(JupiterConfig, "jupiter")
+        return self._config
+
+    @property
+    def quote_cache(self) -> QuoteCache:
+        if self._quote_cache is None:
+            self._quote_cache = QuoteCache(self.config.quote_cache_ttl, self.config.quote_amount_bucket)
+        return self._quote_cache
+
+    @property
+    def upstream(self) -> Upstream:
+        if self._upstream is None:
+            self._upstream = Upstream("jupiter", get_config(ResilienceConfig, "resilience"))
+        return self._upstream
+
+    @property
+    def base_url(self) -> str:
+        return self.config.base_url
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily on first use and reused, so quote and swap share warm connections
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.pool_limit,
+                limit_per_host=self.config.pool_limit_per_host,
+                keepalive_timeout=self.config.keepalive_timeout,
+                ttl_dns_cache=self.config.dns_cache_ttl
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            logger.info("Opened Jupiter API session")
+        return self._session
+
+    async def close_session(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed Jupiter API session")
+        self._session = None
+
+    async def get_token_pairs(self, output_mint: str, amount: int, approximate: bool = False) -> dict:
         if not is_valid_solana_address(output_mint):
             logger.error(f"Invalid output mint address: {output_mint}")
             raise ValueError("Invalid meme coin address")
 
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/quote"
-            params = {
-                "inputMint": self.usdc_address,
-                "outputMint": output_mint,
-                "amount": amount,
-                "slippageBps": 50
-            }
-            logger.debug(f"Sending quote request to {url} with params: {params}")
-            try:
-                async with session.get(url, params=params) as response:
-                    logger.debug(f"Quote request status: {response.status}")
-                    response_text = await response.text()
-                    logger.debug(f"Quote response text: {response_text}")
-                    if response.status != 200:
-                        logger.error(f"Failed to get quote: status={response.status}, response={response_text}")
-                        raise Exception(f"Failed to get quote: {response.status}")
-                    data = await response.json()
-                    logger.debug(f"Quote response data: {data}")
-                    if not data.get("outAmount"):
-                        logger.error(f"Invalid quote response: missing outAmount in {data}")
-                        raise Exception("Invalid quote response: missing outAmount")
-                    logger.info(f"Successfully received quote for output_mint {output_mint}")
-                    return data
-            except Exception as e:
-                logger.error(f"Error getting token pairs for output_mint {output_mint}: {e}")
-                raise
+        if approximate:
+            # Good enough for display: scale the last known price instead of asking Jupiter
+            price = self.quote_cache.price(self.usdc_address, output_mint, self.config.price_ttl)
+            if price is not None:
+                logger.debug(f"Approximate quote for output_mint {output_mint} at price {price}")
+                return {"inAmount": str(amount), "outAmount": str(int(amount * price)), "approximate": True}
+
+        data, _ = await self._cached_quote(output_mint, amount, approximate)
+        if approximate and data.get("inAmount") != str(amount):
+            # Quoted for another amount in the same bucket: scale it to the one asked for
+            out_amount = int(data["outAmount"]) * amount // int(data["inAmount"])
+            return {"inAmount": str(amount), "outAmount": str(out_amount), "approximate": True}
+        return data
+
+    async def get_quote(self, output_mint: str, amount: int) -> tuple:
+        # An exact quote and the time it was fetched, for quotes that may be executed later
+        if not is_valid_solana_address(output_mint):
+            logger.error(f"Invalid output mint address: {output_mint}")
+            raise ValueError("Invalid meme coin address")
+        return await self._cached_quote(output_mint, amount)
+
+    async def _cached_quote(self, output_mint: str, amount: int, approximate: bool = False) -> tuple:
+        key = self.quote_cache.key(self.usdc_address, output_mint, amount, self.config.slippage_bps, approximate)
+        return await self.quote_cache.get(
+            key,
+            lambda: self.upstream.call(self._fetch_quote, output_mint, amount, deadline=self.config.quote_timeout)
+        )
 
-    async def initiate_swap(self, amount: float, meme_coin: str, solana_wallet: str, commission: float, fee_wallet: str) -> str:
+    async def _fetch_quote(self, output_mint: str, amount: int) -> dict:
+        session = await self._get_session()
+        url = f"{self.base_url}/quote"
+        params = {
+            "inputMint": self.usdc_address,
+            "outputMint": output_mint,
+            "amount": amount,
+            "slippageBps": self.config.slippage_bps
+        }
+        logger.debug(f"Sending quote request to {url} with params: {params}")
+        try:
+            async with session.get(url, params=params) as response:
+                logger.debug(f"Quote request status: {response.status}")
+                response_text = await response.text()
+                logger.debug(f"Quote response text: {response_text}")
+                if response.status != 200:
+                    logger.error(f"Failed to get quote: status={response.status}, response={response_text}")
+                    raise upstream_error(response.status, f"Failed to get quote: {response.status}")
+                data = await response.json()
+                logger.debug(f"Quote response data: {data}")
+                if not data.get("outAmount"):
+                    logger.error(f"Invalid quote response: missing outAmount in {data}")
+                    raise Exception("Invalid quote response: missing outAmount")
+                logger.info(f"Successfully received quote for output_mint {output_mint}")
+                return data
+        except Exception as e:
+            logger.error(f"Error getting token pairs for output_mint {output_mint}: {e}")
+            raise
+
+    def _is_reusable_quote(self, quote: dict, quote_fetched_at: float, meme_coin: str, quote_amount: int) -> bool:
+        if not quote or not quote_fetched_at or quote.get("approximate"):
+            return False
+        return (
+            time.time() - quote_fetched_at <= self.config.quote_reuse_window
+            and quote.get("outputMint") == meme_coin
+            and quote.get("inAmount") == str(quote_amount)
+        )
+
+    async def initiate_swap(
+            self,
+            amount: float,
+            meme_coin: str,
+            solana_wallet: str,
+            commission: float,
+            fee_wallet: str,
+            quote: dict = None,
+            quote_fetched_at: float = None
+    ) -> str:
         config = get_config(MemeCoinConfig, "meme_coin")
         if not is_valid_solana_address(meme_coin):
             logger.error(f"Invalid meme coin address: {meme_coin}")
@@ -61,56 +226,76 @@ class JupiterAPI:
 
         amount_lamports = int(amount * 1_000_000)
         commission_lamports = int(commission * 1_000_000)
+        quote_amount = swap_quote_amount(amount, commission)
         logger.debug(f"Calculated swap: amount={amount} USDC ({amount_lamports} lamports), commission={commission} USDC ({commission_lamports} lamports)")
 
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/quote"
-            params = {
-                "inputMint": self.usdc_address,
-                "outputMint": meme_coin,
-                "amount": amount_lamports - commission_lamports,
-                "slippageBps": 50
-            }
-            logger.debug(f"Sending swap quote request to {url} with params: {params}")
+        if self._is_reusable_quote(quote, quote_fetched_at, meme_coin, quote_amount):
+            # The quote shown to the user is still fresh, so skip straight to /swap
+            logger.debug(f"Reusing displayed quote fetched {time.time() - quote_fetched_at:.1f}s ago")
+        else:
             try:
-                async with session.get(url, params=params) as response:
-                    if response.status != 200:
-                        logger.error(f"Failed to get swap quote: status={response.status}, response={await response.text()}")
-                        raise Exception(f"Failed to get swap quote: {response.status}")
-                    quote = await response.json()
-                    logger.debug(f"Swap quote response data: {quote}")
+                # Straight to Jupiter: the quote we execute must be fresh and for exactly this amount
+                quote = await self.upstream.call(
+                    self._fetch_quote, meme_coin, quote_amount, deadline=self.config.quote_timeout
+                )
             except Exception as e:
                 logger.error(f"Error getting swap quote for amount {amount} and meme_coin {meme_coin}: {e}")
                 raise
+            if quote.get("inAmount") != str(quote_amount):
+                logger.error(f"Swap quote is for {quote.get('inAmount')} lamports, expected {quote_amount}")
+                raise Exception("Swap quote amount mismatch")
 
-            url = f"{self.base_url}/swap"
-            payload = {
-                "quoteResponse": quote,
-                "userPublicKey": solana_wallet,
-                "feeAccount": fee_wallet,
-                "feeBps": int(commission * 10000 / amount)
-            }
-            logger.debug(f"Sending swap request to {url} with payload: {payload}")
-            try:
-                async with session.post(url, json=payload) as response:
-                    if response.status != 200:
-                        logger.error(f"Failed to initiate swap: status={response.status}, response={await response.text()}")
-                        raise Exception(f"Failed to initiate swap: {response.status}")
-                    data = await response.json()
-                    tx_hash = data.get("swapTransaction")
-                    if not tx_hash:
-                        logger.error(f"Invalid swap response: {data}")
-                        raise Exception("No transaction hash received")
-                    logger.info(f"Swap initiated: tx_hash={tx_hash}, amount={amount}, commission={commission}, fee_wallet={fee_wallet}")
-                    return tx_hash
-            except Exception as e:
-                logger.error(f"Error initiating swap for amount {amount} and meme_coin {meme_coin}: {e}")
-                raise
+        payload = {
+            "quoteResponse": quote,
+            "userPublicKey": solana_wallet,
+            "feeAccount": fee_wallet,
+            "feeBps": int(commission * 10000 / amount)
+        }
+        try:
+            tx_hash = await self.upstream.call(self._post_swap, payload, deadline=self.config.swap_timeout)
+        except Exception as e:
+            logger.error(f"Error initiating swap for amount {amount} and meme_coin {meme_coin}: {e}")
+            raise
+        logger.info(f"Swap initiated: tx_hash={tx_hash}, amount={amount}, commission={commission}, fee_wallet={fee_wallet}")
+        return tx_hash
+
+    async def _post_swap(self, payload: dict) -> str:
+        session = await self._get_session()
+        url = f"{self.base_url}/swap"
+        logger.debug(f"Sending swap request to {url} with payload: {payload}")
+        async with session.post(url, json=payload) as response:
+            if response.status != 200:
+                logger.error(f"Failed to initiate swap: status={response.status}, response={await response.text()}")
+                raise upstream_error(response.status, f"Failed to initiate swap: {response.status}")
+            data = await response.json()
+            tx_hash = data.get("swapTransaction")
+            if not tx_hash:
+                logger.error(f"Invalid swap response: {data}")
+                raise Exception("No transaction hash received")
+            return tx_hash
 
 jupiter_api = JupiterAPI()
 
-async def get_token_pairs(meme_coin: str, amount: int = 1_000_000) -> dict:
-    return await jupiter_api.get_token_pairs(meme_coin, amount)
+async def get_token_pairs(meme_coin: str, amount: int = 1_000_000, approximate: bool = False) -> dict:
+    return await jupiter_api.get_token_pairs(meme_coin, amount, approximate)
+
+async def get_swap_quote(meme_coin: str, amount: int) -> tuple:
+    return await jupiter_api.get_quote(meme_coin, amount)
+
+def swap_quote_amount(amount: float, commission: float) -> int:
+    # Input amount (in USDC lamports) that initiate_swap quotes for the given arguments
+    return int(amount * 1_000_000) - int(commission * 1_000_000)
 
-async def initiate_swap(amount: float, meme_coin: str, solana_wallet: str, commission: float, fee_wallet: str) -> str:
-    return await jupiter_api.initiate_swap(amount, meme_coin, solana_wallet, commission, fee_wallet)
+async def initiate_swap(
+        amount: float,
+        meme_coin: str,
+        solana_wallet: str,
+        commission: float,
+        fee_wallet: str,
+        quote: dict = None,
+        quote_fetched_at: float = None
+) -> str:
+    return await jupiter_api.initiate_swap(
+        amount, meme_coin, solana_wallet, commission, fee_wallet,
+        quote=quote, quote_fetched_at=quote_fetched_at
+    )
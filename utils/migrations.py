@@ -0,0 +1,198 @@
+import logging
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key; every replica takes the same lock so only one migrates
+MIGRATIONS_LOCK_ID = 727_001
+
+# Ordered (version, name, sql). Applied migrations are never edited: add a new one instead.
+# 1-3 match the schema db_start() used to create, so existing databases adopt them as no-ops.
+MIGRATIONS = [
+    (1, "create transactions", '''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            solana_wallet TEXT NOT NULL,
+            amount_in TEXT NOT NULL,
+            commission_amount TEXT NOT NULL,
+            operation_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            tx_id TEXT,
+            solana_tx_hash TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_transactions_status_op ON transactions (status, operation_type);
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions (user_id);
+    '''),
+    (2, "bridge poller scheduling and leases", '''
+        ALTER TABLE transactions ADD COLUMN IF NOT EXISTS next_check_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+        ALTER TABLE transactions ADD COLUMN IF NOT EXISTS check_attempts INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE transactions ADD COLUMN IF NOT EXISTS claimed_by TEXT;
+        ALTER TABLE transactions ADD COLUMN IF NOT EXISTS claim_expires_at TIMESTAMP;
+    '''),
+    (3, "bridge status notifications", '''
+        CREATE OR REPLACE FUNCTION notify_bridge_event() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.operation_type = 'bridge' AND (TG_OP = 'INSERT' OR NEW.status IS DISTINCT FROM OLD.status) THEN
+                PERFORM pg_notify(
+                    'bridge_events',
+                    json_build_object('id', NEW.id, 'status', NEW.status)::text
+                );
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        CREATE OR REPLACE TRIGGER transactions_bridge_notify
+            AFTER INSERT OR UPDATE OF status ON transactions
+            FOR EACH ROW EXECUTE FUNCTION notify_bridge_event();
+    '''),
+    (4, "micro-unit amounts, amount_out and open bridge index", '''
+        ALTER TABLE transactions
+            ALTER COLUMN amount_in TYPE BIGINT USING (
+                CASE WHEN amount_in ~ '^[+-]?([0-9]+\\.?[0-9]*|\\.[0-9]+)([eE][+-]?[0-9]+)?$'
+                     THEN round(amount_in::numeric * 1000000) ELSE 0 END
+            ),
+            ALTER COLUMN commission_amount TYPE BIGINT USING (
+                CASE WHEN commission_amount ~ '^[+-]?([0-9]+\\.?[0-9]*|\\.[0-9]+)([eE][+-]?[0-9]+)?$'
+                     THEN round(commission_amount::numeric * 1000000) ELSE 0 END
+            ),
+            ADD COLUMN IF NOT EXISTS amount_out BIGINT;
+        -- The poller only ever looks at open bridges; keep that index as small as they are
+        CREATE INDEX IF NOT EXISTS idx_transactions_open_bridges ON transactions (next_check_at)
+            WHERE status = 'pending' AND operation_type = 'bridge';
+        DROP INDEX IF EXISTS idx_transactions_status_op;
+    '''),
+    (5, "write-behind log reference", '''
+        -- Stream entry id of a write-behind row; replaying the stream after a crash upserts on it
+        ALTER TABLE transactions ADD COLUMN IF NOT EXISTS log_ref TEXT;
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_log_ref ON transactions (log_ref, created_at);
+    '''),
+    (6, "monthly partitioning by created_at", '''
+        -- The existing heap becomes one partition covering everything up to next month,
+        -- so no rows are copied; utils/partitions.py adds the monthly partitions after it
+        UPDATE transactions SET created_at = 'epoch' WHERE created_at IS NULL;
+        ALTER TABLE transactions ALTER COLUMN created_at SET NOT NULL;
+        ALTER TABLE transactions RENAME TO transactions_legacy;
+        -- A partition can't keep its own PK: swap it for the (id, created_at) key the parent will adopt
+        ALTER TABLE transactions_legacy DROP CONSTRAINT transactions_pkey;
+        ALTER TABLE transactions_legacy ADD CONSTRAINT transactions_legacy_pkey PRIMARY KEY (id, created_at);
+        ALTER INDEX idx_transactions_user_id RENAME TO idx_transactions_legacy_user_id;
+        ALTER INDEX idx_transactions_open_bridges RENAME TO idx_transactions_legacy_open_bridges;
+        ALTER INDEX idx_transactions_log_ref RENAME TO idx_transactions_legacy_log_ref;
+        DROP TRIGGER transactions_bridge_notify ON transactions_legacy;
+
+        CREATE TABLE transactions (LIKE transactions_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            PARTITION BY RANGE (created_at);
+        ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id;
+        DO $$
+        BEGIN
+            EXECUTE format(
+                'ALTER TABLE transactions ATTACH PARTITION transactions_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+                date_trunc('month', LOCALTIMESTAMP) + interval '1 month'
+            );
+        END;
+        $$;
+        CREATE TABLE transactions_default PARTITION OF transactions DEFAULT;
+
+        -- Indexes on the parent cascade to every partition (and adopt the legacy ones)
+        ALTER TABLE transactions ADD PRIMARY KEY (id, created_at);
+        CREATE INDEX idx_transactions_user_id ON transactions (user_id);
+        CREATE INDEX idx_transactions_open_bridges ON transactions (next_check_at)
+            WHERE status = 'pending' AND operation_type = 'bridge';
+        CREATE UNIQUE INDEX idx_transactions_log_ref ON transactions (log_ref, created_at);
+        CREATE TRIGGER transactions_bridge_notify
+            AFTER INSERT OR UPDATE OF status ON transactions
+            FOR EACH ROW EXECUTE FUNCTION notify_bridge_event();
+    '''),
+    (7, "history keyset index and per-user summaries", '''
+        -- Serves /history pages: WHERE user_id = $1 AND (created_at, id) < cursor ORDER BY created_at DESC, id DESC
+        CREATE INDEX idx_transactions_user_history ON transactions (user_id, created_at DESC, id DESC);
+        DROP INDEX IF EXISTS idx_transactions_user_id;
+
+        CREATE TABLE user_summaries (
+            user_id BIGINT PRIMARY KEY,
+            bridged_amount BIGINT NOT NULL DEFAULT 0,
+            bridge_count INTEGER NOT NULL DEFAULT 0,
+            swapped_amount BIGINT NOT NULL DEFAULT 0,
+            swap_count INTEGER NOT NULL DEFAULT 0,
+            commission_amount BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Adds what a row contributes once it reaches a completed status, minus what it
+        -- contributed before, so the summary never needs an aggregate over history
+        CREATE FUNCTION update_user_summary() RETURNS trigger AS $$
+        DECLARE
+            bridged BIGINT := 0; bridges INTEGER := 0;
+            swapped BIGINT := 0; swaps INTEGER := 0; commission BIGINT := 0;
+        BEGIN
+            IF NEW.operation_type = 'bridge' AND NEW.status = 'bridge_completed' THEN
+                bridged := NEW.amount_in; bridges := 1;
+            ELSIF NEW.operation_type = 'swap' AND NEW.status = 'swap_completed' THEN
+                swapped := NEW.amount_in; swaps := 1; commission := NEW.commission_amount;
+            END IF;
+            IF TG_OP = 'UPDATE' THEN
+                IF OLD.operation_type = 'bridge' AND OLD.status = 'bridge_completed' THEN
+                    bridged := bridged - OLD.amount_in; bridges := bridges - 1;
+                ELSIF OLD.operation_type = 'swap' AND OLD.status = 'swap_completed' THEN
+                    swapped := swapped - OLD.amount_in; swaps := swaps - 1;
+                    commission := commission - OLD.commission_amount;
+                END IF;
+            END IF;
+            IF bridges <> 0 OR swaps <> 0 THEN
+                INSERT INTO user_summaries AS s
+                    (user_id, bridged_amount, bridge_count, swapped_amount, swap_count, commission_amount)
+                VALUES (NEW.user_id, bridged, bridges, swapped, swaps, commission)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    bridged_amount = s.bridged_amount + EXCLUDED.bridged_amount,
+                    bridge_count = s.bridge_count + EXCLUDED.bridge_count,
+                    swapped_amount = s.swapped_amount + EXCLUDED.swapped_amount,
+                    swap_count = s.swap_count + EXCLUDED.swap_count,
+                    commission_amount = s.commission_amount + EXCLUDED.commission_amount,
+                    updated_at = CURRENT_TIMESTAMP;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        CREATE TRIGGER transactions_user_summary
+            AFTER INSERT OR UPDATE OF status ON transactions
+            FOR EACH ROW EXECUTE FUNCTION update_user_summary();
+
+        -- The trigger's lock holds writers off until commit, so the backfill sees every row
+        INSERT INTO user_summaries (user_id, bridged_amount, bridge_count, swapped_amount, swap_count, commission_amount)
+        SELECT user_id,
+               COALESCE(SUM(amount_in) FILTER (WHERE operation_type = 'bridge' AND status = 'bridge_completed'), 0),
+               COUNT(*) FILTER (WHERE operation_type = 'bridge' AND status = 'bridge_completed'),
+               COALESCE(SUM(amount_in) FILTER (WHERE operation_type = 'swap' AND status = 'swap_completed'), 0),
+               COUNT(*) FILTER (WHERE operation_type = 'swap' AND status = 'swap_completed'),
+               COALESCE(SUM(commission_amount) FILTER (WHERE operation_type = 'swap' AND status = 'swap_completed'), 0)
+        FROM transactions
+        GROUP BY user_id;
+    '''),
+]
+
+async def run_migrations(conn: asyncpg.Connection):
+    # Session-level advisory lock: replicas starting together wait here instead of racing the DDL
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_ID)
+    try:
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        applied = {row["version"] for row in await conn.fetch("SELECT version FROM schema_migrations")}
+        for version, name, sql in MIGRATIONS:
+            if version in applied:
+                continue
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                    version, name
+                )
+            logger.info(f"Applied migration {version}: {name}")
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATIONS_LOCK_ID)
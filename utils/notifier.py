@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+import time
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+
+from config import NotifierConfig
+from utils.db import get_redis
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class Notifier:
+    """
+    Outbound message queue for the Bot.
+
+    Messages are persisted in a Redis list and delivered by a few worker
+    tasks under a global token bucket plus per-chat pacing. A message is
+    moved to this instance's own processing list while it is being sent.
+    Each instance keeps an owner key alive with a heartbeat; once it lapses,
+    any other instance requeues that processing list, so messages in flight
+    when a process died are delivered without touching live replicas' work.
+    """
+
+    def __init__(self, bot: Bot, config: NotifierConfig):
+        self.bot = bot
+        self.config = config
+        self.redis = get_redis()
+        self.queue_key = config.queue_key
+        self.worker_id = config.worker_id
+        self.owners_key = f"{config.queue_key}:owners"
+        self.processing_key = self._processing_key(self.worker_id)
+        self._bucket = TokenBucket(config.global_rate, config.global_rate)
+        self._chat_next_send = {}
+        self._chat_lock = asyncio.Lock()
+        self._paused_until = 0.0
+        self._workers = []
+        self.sent = 0
+        self.dropped = 0
+        self.avg_latency = 0.0
+
+    async def send(self, chat_id: int, text: str, reply_markup: InlineKeyboardMarkup = None):
+        message = {
+            "chat_id": chat_id,
+            "text": text,
+            "reply_markup": reply_markup.model_dump_json(exclude_none=True) if reply_markup else None,
+            "enqueued_at": time.time()
+        }
+        try:
+            await self.redis.rpush(self.queue_key, json.dumps(message))
+            logger.debug(f"Queued message for chat {chat_id}")
+        except Exception as e:
+            logger.error(f"Failed to queue message for chat {chat_id}, sending inline: {e}")
+            await self._deliver(message)
+
+    def _processing_key(self, worker_id: str) -> str:
+        return f"{self.queue_key}:processing:{worker_id}"
+
+    def _owner_key(self, worker_id: str) -> str:
+        return f"{self.queue_key}:owner:{worker_id}"
+
+    async def start(self):
+        await self._heartbeat_once()
+        await self.redis.sadd(self.owners_key, self.worker_id)
+        # Whatever this worker id left in flight last time is ours to requeue, along with dead owners' lists
+        await self._requeue(self.worker_id)
+        await self._reclaim_dead_owners()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.config.workers)]
+        self._workers.append(asyncio.create_task(self._report()))
+        self._workers.append(asyncio.create_task(self._heartbeat()))
+        logger.info(f"Notifier {self.worker_id} started with {self.config.workers} workers")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        try:
+            # Hand back anything cancelled mid-send, then retire this owner
+            await self._requeue(self.worker_id)
+            await self.redis.srem(self.owners_key, self.worker_id)
+            await self.redis.delete(self._owner_key(self.worker_id))
+        except Exception as e:
+            logger.warning(f"Failed to release notifier {self.worker_id}: {e}")
+        logger.info("Notifier stopped")
+
+    async def _heartbeat_once(self):
+        await self.redis.set(self._owner_key(self.worker_id), int(time.time()), px=int(self.config.owner_ttl * 1000))
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.config.owner_ttl / 3)
+            try:
+                await self._heartbeat_once()
+                await self._reclaim_dead_owners()
+            except Exception as e:
+                logger.warning(f"Notifier heartbeat failed: {e}")
+
+    async def _reclaim_dead_owners(self):
+        for owner in await self.redis.smembers(self.owners_key):
+            owner = owner.decode() if isinstance(owner, bytes) else owner
+            if owner == self.worker_id or await self.redis.exists(self._owner_key(owner)):
+                continue
+            await self._requeue(owner)
+            await self.redis.srem(self.owners_key, owner)
+
+    async def _requeue(self, worker_id: str):
+        # LMOVE is atomic, so two instances reclaiming the same list never requeue a message twice
+        requeued = 0
+        while await self.redis.lmove(self._processing_key(worker_id), self.queue_key, src="RIGHT", dest="LEFT"):
+            requeued += 1
+        if requeued:
+            logger.info(f"Requeued {requeued} undelivered messages from {worker_id}")
+
+    async def stats(self) -> dict:
+        return {
+            "queue_depth": await self.redis.llen(self.queue_key),
+            "in_flight": await self.redis.llen(self.processing_key),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "avg_latency": self.avg_latency
+        }
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.config.stats_interval)
+            try:
+                logger.info(f"Notifier stats: {await self.stats()}")
+            except Exception as e:
+                logger.warning(f"Failed to collect notifier stats: {e}")
+
+    async def _worker(self):
+        while True:
+            try:
+                raw = await self.redis.blmove(self.queue_key, self.processing_key, timeout=1)
+                if raw is None:
+                    continue
+                await self._deliver(json.loads(raw))
+                await self.redis.lrem(self.processing_key, 1, raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notifier worker error: {e}")
+                await asyncio.sleep(1)
+
+    async def _wait_for_slot(self, chat_id: int):
+        async with self._chat_lock:
+            now = time.monotonic()
+            send_at = max(now, self._paused_until, self._chat_next_send.get(chat_id, 0.0))
+            self._chat_next_send[chat_id] = send_at + self.config.per_chat_interval
+            if len(self._chat_next_send) > 10_000:
+                self._chat_next_send = {k: v for k, v in self._chat_next_send.items() if v > now}
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+        await self._bucket.acquire()
+
+    async def _deliver(self, message: dict):
+        chat_id = message["chat_id"]
+        reply_markup = message.get("reply_markup")
+        flood_limited = False
+        for attempt in range(1, self.config.max_attempts + 1):
+            await self._wait_for_slot(chat_id)
+            try:
+                await self.bot.send_message(
+                    chat_id=chat_id,
+                    text=message["text"],
+                    reply_markup=InlineKeyboardMarkup.model_validate_json(reply_markup) if reply_markup else None
+                )
+                latency = time.time() - message["enqueued_at"]
+                self.avg_latency = latency if not self.sent else 0.9 * self.avg_latency + 0.1 * latency
+                self.sent += 1
+                logger.debug(f"Delivered message to chat {chat_id} in {latency:.2f}s")
+                return
+            except TelegramRetryAfter as e:
+                flood_limited = True
+                # Flood control applies to the whole bot, so pause every worker
+                logger.warning(f"Flood control for chat {chat_id}, retrying in {e.retry_after}s")
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            except (TelegramBadRequest, TelegramForbiddenError) as e:
+                logger.warning(f"Failed to send message to {chat_id}: {e}")
+                self.dropped += 1
+                return
+            except Exception as e:
+                flood_limited = False
+                logger.warning(f"Error sending message to {chat_id} (attempt {attempt}): {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+        if flood_limited:
+            # The message itself is fine, Telegram only wants us to slow down: put it back at the front
+            try:
+                await self.redis.lpush(self.queue_key, json.dumps(message))
+                logger.warning(f"Flood control persists, requeued message to {chat_id}")
+                return
+            except Exception as e:
+                logger.error(f"Failed to requeue message to {chat_id}: {e}")
+        logger.error(f"Giving up on message to {chat_id} after {self.config.max_attempts} attempts")
+        self.dropped += 1
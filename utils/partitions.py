@@ -0,0 +1,128 @@
+import asyncio
+import gzip
+import logging
+import os
+import re
+import socket
+from contextlib import suppress
+from datetime import datetime
+
+from config import PartitionConfig
+from utils.db import acquire
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "transactions"
+MAINTENANCE_LOCK_ID = 727_002
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT_TABLE}_p{month:%Y_%m}"
+
+async def list_partitions(conn) -> list:
+    # (name, upper bound) per partition; the default partition has no upper bound
+    rows = await conn.fetch(
+        '''
+        SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = $1::regclass
+        ''',
+        PARENT_TABLE
+    )
+    partitions = []
+    for row in rows:
+        match = _UPPER_BOUND.search(row["bound"])
+        partitions.append((row["name"], datetime.fromisoformat(match.group(1)) if match else None))
+    return partitions
+
+class PartitionMaintainer:
+    """
+    Keeps the monthly partitions of transactions in shape.
+
+    Each run creates partitions for the next months_ahead months and, when
+    archiving is enabled, writes every partition that ended more than
+    retention_months ago to a gzipped CSV in archive_dir before detaching and
+    dropping it. A partition that still has pending rows is left alone.
+    """
+
+    def __init__(self, config: PartitionConfig):
+        self.config = config
+
+    async def run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Partition maintenance failed: {e}", exc_info=True)
+            await asyncio.sleep(self.config.maintenance_interval)
+
+    async def run_once(self):
+        async with acquire() as conn:
+            # Every replica runs the maintainer; only the one holding the lock does the work this round
+            if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", MAINTENANCE_LOCK_ID):
+                logger.debug("Partition maintenance is running elsewhere, skipping this round")
+                return
+            try:
+                current_month = await conn.fetchval("SELECT date_trunc('month', LOCALTIMESTAMP)")
+                await self.ensure_partitions(conn, current_month)
+                if self.config.archive_enabled:
+                    await self.archive_old_partitions(conn, current_month)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", MAINTENANCE_LOCK_ID)
+
+    async def ensure_partitions(self, conn, current_month: datetime):
+        partitions = await list_partitions(conn)
+        existing = {name for name, _ in partitions}
+        # Months below the highest existing bound are already covered (e.g. by the legacy partition)
+        covered_until = max((bound for _, bound in partitions if bound), default=current_month)
+        for offset in range(self.config.months_ahead + 1):
+            start = add_months(current_month, offset)
+            if start < covered_until:
+                continue
+            if partition_name(start) in existing:
+                continue
+            end = add_months(start, 1)
+            await conn.execute(
+                f'''
+                CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {PARENT_TABLE}
+                FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
+                '''
+            )
+            logger.info(f"Created partition {partition_name(start)}")
+
+    async def archive_old_partitions(self, conn, current_month: datetime):
+        cutoff = add_months(current_month, -self.config.retention_months)
+        for name, upper_bound in await list_partitions(conn):
+            if upper_bound is None or upper_bound > cutoff:
+                continue
+            if await conn.fetchval(f"SELECT EXISTS (SELECT 1 FROM {name} WHERE status = 'pending')"):
+                logger.warning(f"Partition {name} still has pending transactions, not archiving it")
+                continue
+            path = await self.archive_partition(conn, name)
+            async with conn.transaction():
+                await conn.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+                await conn.execute(f"DROP TABLE {name}")
+            logger.info(f"Archived partition {name} to {path} and dropped it")
+
+    async def archive_partition(self, conn, name: str) -> str:
+        os.makedirs(self.config.archive_dir, exist_ok=True)
+        path = os.path.join(self.config.archive_dir, f"{name}.csv.gz")
+        # Unique per writer, so a stray run elsewhere never writes into the same file
+        partial_path = f"{path}.{socket.gethostname()}.{os.getpid()}.partial"
+        try:
+            with gzip.open(partial_path, "wb") as archive:
+                async def write(chunk: bytes):
+                    await asyncio.to_thread(archive.write, chunk)
+                await conn.copy_from_table(name, output=write, format="csv", header=True)
+        except BaseException:
+            with suppress(OSError):
+                os.remove(partial_path)
+            raise
+        # Only a complete archive gets the final name, and only then is the partition dropped
+        os.replace(partial_path, path)
+        return path
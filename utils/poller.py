@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal
+from fluentogram import TranslatorHub
+from backoff import on_exception, expo
+
+from config import PollerConfig
+from utils.db import (get_pending_bridges, claim_pending_bridges, fail_expired_bridges, apply_bridge_updates,
+                      get_next_bridge_check_at, listen_bridge_events)
+from utils.rhino import rhino_client
+from utils.notifier import Notifier
+from keyboards.keyboards import bridge_completed
+
+logger = logging.getLogger(__name__)
+
+class BridgePoller:
+    def __init__(self, notifier: Notifier, translator_hub: TranslatorHub, config: PollerConfig):
+        self.notifier = notifier
+        self.translator_hub = translator_hub
+        self.config = config
+        self._semaphore = asyncio.Semaphore(config.concurrency)
+        # Retries are applied per transaction, so one failing quote only delays itself;
+        # they stop when the Rhino breaker is open or the shared retry budget is spent
+        self._check_status = on_exception(
+            expo, Exception,
+            max_tries=config.max_tries,
+            giveup=lambda e: not rhino_client.upstream.should_retry(e)
+        )(self._check_status_once)
+        self._wakeup = asyncio.Event()
+        self._listener = None
+        self.last_cycle_duration = 0.0
+        self.backlog = 0
+
+    def next_check_delay(self, check_attempts: int) -> float:
+        delay = self.config.check_delay_base * self.config.check_delay_factor ** check_attempts
+        return float(min(delay, self.config.check_delay_max))
+
+    async def run(self):
+        try:
+            while True:
+                try:
+                    await self.run_cycle()
+                except Exception as e:
+                    logger.error(f"Polling error: {e}")
+                await self._wait_for_work()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._listener and not self._listener.is_closed():
+            await self._listener.close()
+        self._listener = None
+
+    def _on_bridge_event(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Malformed {channel} payload: {payload}")
+            return
+        # Terminal transitions (including our own updates) need no new poll
+        if event.get("status") == "pending":
+            self._wakeup.set()
+
+    async def _ensure_listener(self) -> bool:
+        if not self.config.listen:
+            return False
+        if self._listener and not self._listener.is_closed():
+            return True
+        try:
+            self._listener = await listen_bridge_events(self._on_bridge_event)
+            return True
+        except Exception as e:
+            logger.warning(f"Bridge notifications unavailable, falling back to timer: {e}")
+            self._listener = None
+            return False
+
+    async def _wait_for_work(self):
+        if await self._ensure_listener():
+            next_check_at = await get_next_bridge_check_at()
+            if next_check_at is None:
+                timeout = self.config.idle_interval
+            else:
+                due_in = (next_check_at - datetime.now()).total_seconds()
+                timeout = min(max(due_in, self.config.min_interval), self.config.idle_interval)
+        else:
+            timeout = self.config.interval
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def run_cycle(self):
+        started = time.monotonic()
+        for row in await fail_expired_bridges(self.config.bridge_timeout_minutes):
+            await self._notify(row)
+
+        pending_bridges = await self._fetch_due_bridges()
+        self.backlog = len(pending_bridges)
+        results = await asyncio.gather(
+            *(self._check_bridge(tx) for tx in pending_bridges),
+            return_exceptions=True
+        )
+        transitions, reschedules = [], []
+        failed = 0
+        for tx, result in zip(pending_bridges, results):
+            if isinstance(result, Exception):
+                failed += 1
+                logger.warning(f"Failed to check bridge {tx['id']} (tx_id {tx['tx_id']}): {result!r}")
+                # Back off failing rows too, so a broken quote doesn't come up every cycle
+                reschedules.append(self._reschedule(tx))
+                continue
+            transition = self._transition(tx, result)
+            if transition:
+                transitions.append(transition)
+            else:
+                reschedules.append(self._reschedule(tx))
+
+        for row in await apply_bridge_updates(transitions, reschedules):
+            await self._notify(row)
+
+        self.last_cycle_duration = time.monotonic() - started
+        logger.info(
+            f"Bridge poll cycle finished in {self.last_cycle_duration:.2f}s: "
+            f"backlog={self.backlog}, transitions={len(transitions)}, failed={failed}"
+        )
+        if self.last_cycle_duration > self.config.interval:
+            logger.warning(
+                f"Bridge poll cycle took {self.last_cycle_duration:.2f}s, "
+                f"longer than the {self.config.interval}s interval"
+            )
+
+    async def _fetch_due_bridges(self) -> list:
+        if self.config.claim_rows:
+            return await claim_pending_bridges(
+                worker_id=self.config.worker_id,
+                lease_seconds=self.config.lease_seconds,
+                limit=self.config.batch_size
+            )
+        return await get_pending_bridges(due_only=True)
+
+    async def _check_status_once(self, tx_id: str) -> dict:
+        # The slot covers a single request only, so backoff sleeps don't hold up other rows
+        async with self._semaphore:
+            return await rhino_client.check_bridge_status(tx_id)
+
+    async def _check_bridge(self, tx: dict) -> dict:
+        return await self._check_status(tx["tx_id"])
+
+    @staticmethod
+    def _amount_out(tx: dict, value):
+        # Rhino reports micro-units, occasionally with a fractional part ("12.5")
+        if value in (None, ""):
+            return None
+        try:
+            return int(Decimal(str(value)).to_integral_value())
+        except (ArithmeticError, ValueError):
+            # Still record the final status; a bad amount must not keep the bridge pending
+            logger.warning(f"Bridge {tx['id']} reported an invalid amount_out {value!r}, storing none")
+            return None
+
+    @classmethod
+    def _transition(cls, tx: dict, status_info: dict):
+        if status_info["status"] == "executed":
+            return {
+                "id": tx["id"],
+                "status": "bridge_completed",
+                "amount_out": cls._amount_out(tx, status_info["amount_out"]),
+                "solana_tx_hash": status_info["solana_tx_hash"]
+            }
+        if status_info["status"] in ["failed", "stuck"]:
+            return {"id": tx["id"], "status": "failed_bridge"}
+        return None
+
+    def _reschedule(self, tx: dict) -> dict:
+        check_attempts = tx["check_attempts"] + 1
+        return {
+            "id": tx["id"],
+            "check_attempts": check_attempts,
+            "delay": self.next_check_delay(check_attempts)
+        }
+
+    async def apply_status(self, tx: dict, status_info: dict) -> bool:
+        # Used by pushed callbacks; returns True once the bridge is final
+        transition = self._transition(tx, status_info)
+        if not transition:
+            return False
+        for row in await apply_bridge_updates([transition], []):
+            await self._notify(row)
+        return True
+
+    async def _notify(self, row: dict):
+        if row["status"] == "bridge_completed":
+            await self._notify_completed(row)
+        else:
+            await self._notify_failed(row)
+
+    async def _notify_completed(self, tx: dict):
+        i18n = self.translator_hub.get_translator_by_locale("ru")
+        await self.notifier.send(
+            chat_id=tx["user_id"],
+            text=i18n.bridge.completed.message(
+                amount_out=float(tx["amount_out"]) / 10**6 if tx["amount_out"] else "0",
+                solana_wallet=tx["solana_wallet"]
+            ),
+            reply_markup=bridge_completed(i18n)
+        )
+
+    async def _notify_failed(self, tx: dict):
+        i18n = self.translator_hub.get_translator_by_locale("ru")
+        await self.notifier.send(
+            chat_id=tx["user_id"],
+            text=i18n.bridge.failed.message()
+        )
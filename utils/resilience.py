@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+
+from config import ResilienceConfig
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable, retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+class UpstreamClientError(Exception):
+    # The upstream rejected the request itself (4xx); says nothing about its health
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def upstream_error(status: int, message: str) -> Exception:
+    # 429 means the upstream is overloaded, so it counts as a failure like 5xx does
+    if 400 <= status < 500 and status != 429:
+        return UpstreamClientError(status, message)
+    return Exception(message)
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failures; open -> half-open
+    after reset_timeout, where a single probe call decides whether to close again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def before_call(self):
+        if self.state == self.OPEN:
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit {self.name} half-open, probing")
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._probing = True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def release_probe(self):
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit {self.name} opened after {self._failures} failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+class RetryBudget:
+    # Every call earns `ratio` of a retry token; retries spend whole tokens, so
+    # retries stay a bounded fraction of traffic no matter how many callers retry
+    def __init__(self, ratio: float, min_tokens: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+
+    def deposit(self):
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+class Upstream:
+    def __init__(self, name: str, config: ResilienceConfig):
+        self.name = name
+        self.breaker = CircuitBreaker(name, config.failure_threshold, config.reset_timeout)
+        self.retry_budget = RetryBudget(config.retry_ratio, config.min_retry_tokens, config.max_retry_tokens)
+
+    async def call(self, func, *args, deadline: float, **kwargs):
+        self.breaker.before_call()
+        self.retry_budget.deposit()
+        try:
+            result = await asyncio.wait_for(func(*args, **kwargs), deadline)
+        except (ValueError, UpstreamClientError, asyncio.CancelledError):
+            # Caller errors, rejected requests and cancellation say nothing about upstream health
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def should_retry(self, error: Exception) -> bool:
+        if isinstance(error, (CircuitOpenError, UpstreamClientError, ValueError)):
+            return False
+        return self.retry_budget.withdraw()
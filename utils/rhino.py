@@ -1,13 +1,70 @@
 import aiohttp
+import asyncio
 import logging
-from config import get_config, RhinoConfig
+import time
+from config import get_config, RhinoConfig, ResilienceConfig
+from utils.resilience import Upstream, CircuitOpenError, upstream_error
 
 logger = logging.getLogger(__name__)
 
-async def get_bridge_quote(amount: float, ton_wallet: str, solana_wallet: str) -> dict:
-    config = get_config(RhinoConfig, "rhino")
-    async with aiohttp.ClientSession() as session:
-        headers = {"Authorization": f"Bearer {config.api_key.get_secret_value()}"}
+class RhinoClient:
+    def __init__(self):
+        self._session = None
+        self._config = None
+        self._upstream = None
+
+    @property
+    def config(self) -> RhinoConfig:
+        if self._config is None:
+            self._config = get_config(RhinoConfig, "rhino")
+        return self._config
+
+    @property
+    def upstream(self) -> Upstream:
+        if self._upstream is None:
+            self._upstream = Upstream("rhino", get_config(ResilienceConfig, "resilience"))
+        return self._upstream
+
+    async def start(self):
+        await self._get_session()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # One long-lived session keeps DNS results and TLS connections warm between calls
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.pool_limit,
+                limit_per_host=self.config.pool_limit_per_host,
+                keepalive_timeout=self.config.keepalive_timeout,
+                ttl_dns_cache=self.config.dns_cache_ttl
+            )
+            self._session = aiohttp.ClientSession(
+                base_url=self.config.base_url,
+                connector=connector,
+                headers={"Authorization": f"Bearer {self.config.api_key.get_secret_value()}"}
+            )
+            logger.info("Opened Rhino API session")
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed Rhino API session")
+        self._session = None
+
+    # Public calls go through the circuit breaker with a per-endpoint deadline
+    async def get_bridge_quote(self, amount: float, ton_wallet: str, solana_wallet: str) -> dict:
+        return await self.upstream.call(
+            self._get_bridge_quote, amount, ton_wallet, solana_wallet, deadline=self.config.quote_timeout
+        )
+
+    async def commit_quote(self, quote_id: str):
+        return await self.upstream.call(self._commit_quote, quote_id, deadline=self.config.commit_timeout)
+
+    async def check_bridge_status(self, quote_id: str) -> dict:
+        return await self.upstream.call(self._check_bridge_status, quote_id, deadline=self.config.status_timeout)
+
+    async def _get_bridge_quote(self, amount: float, ton_wallet: str, solana_wallet: str) -> dict:
+        session = await self._get_session()
         payload = {
             "fromChain": "TON",
             "toChain": "SOLANA",
@@ -20,35 +77,31 @@ async def get_bridge_quote(amount: float, ton_wallet: str, solana_wallet: str) -
             "gasBoost": {"amountNative": "0.001"}
         }
         logger.debug(f"Sending /bridge/quote request with payload: {payload}")
-        async with session.post("https://api.rhino.fi/bridge/quote", json=payload, headers=headers) as resp:
+        async with session.post("/bridge/quote", json=payload) as resp:
             if resp.status != 200:
                 logger.error(f"Failed to get bridge quote: status={resp.status}, response={await resp.text()}")
-                raise Exception(f"Failed to get bridge quote: {resp.status}")
+                raise upstream_error(resp.status, f"Failed to get bridge quote: {resp.status}")
             data = await resp.json()
             logger.info(f"Received bridge quote: quoteId={data.get('quoteId')}")
             return data
 
-async def commit_quote(quote_id: str):
-    config = get_config(RhinoConfig, "rhino")
-    async with aiohttp.ClientSession() as session:
-        headers = {"Authorization": f"Bearer {config.api_key.get_secret_value()}"}
+    async def _commit_quote(self, quote_id: str):
+        session = await self._get_session()
         payload = {"quoteId": quote_id}
         logger.debug(f"Sending /bridge/commit request with payload: {payload}")
-        async with session.post("https://api.rhino.fi/bridge/commit", json=payload, headers=headers) as resp:
+        async with session.post("/bridge/commit", json=payload) as resp:
             if resp.status != 200:
                 logger.error(f"Failed to commit quote: status={resp.status}, response={await resp.text()}")
-                raise Exception(f"Failed to commit quote: {resp.status}")
+                raise upstream_error(resp.status, f"Failed to commit quote: {resp.status}")
             logger.info(f"Committed quote: {quote_id}")
 
-async def check_bridge_status(quote_id: str) -> dict:
-    config = get_config(RhinoConfig, "rhino")
-    async with aiohttp.ClientSession() as session:
-        headers = {"Authorization": f"Bearer {config.api_key.get_secret_value()}"}
+    async def _check_bridge_status(self, quote_id: str) -> dict:
+        session = await self._get_session()
         logger.debug(f"Checking status for quote_id: {quote_id}")
-        async with session.get(f"https://api.rhino.fi/bridge/status/{quote_id}", headers=headers) as resp:
+        async with session.get(f"/bridge/status/{quote_id}") as resp:
             if resp.status != 200:
                 logger.error(f"Failed to check status: status={resp.status}, response={await resp.text()}")
-                raise Exception(f"Failed to check bridge status: {resp.status}")
+                raise upstream_error(resp.status, f"Failed to check bridge status: {resp.status}")
             data = await resp.json()
             logger.info(f"Bridge status for {quote_id}: {data.get('status')}")
             return {
@@ -57,14 +110,80 @@ async def check_bridge_status(quote_id: str) -> dict:
                 "solana_tx_hash": data.get("withdrawTxHash")
             }
 
-async def create_bridge(amount: float, solana_wallet: str, jetton_wallet: str) -> dict:
+class BridgeQuotePrefetcher:
+    """
+    Speculative bridge quotes requested while the user is still in the FSM flow.
+
+    A quote is started as soon as the amount is known (using the user's
+    last Solana wallet) and handed to create_bridge only if the amount and
+    wallets still match and it is younger than the configured TTL.
+    """
+
+    def __init__(self, client: RhinoClient, max_entries: int = 10_000):
+        self.client = client
+        self.max_entries = max_entries
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, user_id: int, amount: float, ton_wallet: str, solana_wallet: str):
+        self.discard(user_id)
+        if len(self._entries) >= self.max_entries:
+            self.discard(next(iter(self._entries)))
+        task = asyncio.create_task(self.client.get_bridge_quote(amount, ton_wallet, solana_wallet))
+        # A discarded prefetch may fail unobserved; consume its exception
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._entries[user_id] = (task, (amount, ton_wallet, solana_wallet), time.monotonic())
+        logger.debug(f"Prefetching bridge quote for user {user_id}")
+
+    def discard(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry:
+            entry[0].cancel()
+
+    async def take(self, user_id: int, amount: float, ton_wallet: str, solana_wallet: str):
+        entry = self._entries.pop(user_id, None)
+        if not entry:
+            return None
+        task, params, created = entry
+        if params != (amount, ton_wallet, solana_wallet) or time.monotonic() - created > self.client.config.prefetch_ttl:
+            task.cancel()
+            self.misses += 1
+            return None
+        try:
+            quote = await task
+        except Exception as e:
+            logger.warning(f"Prefetched bridge quote for user {user_id} failed: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        logger.info(f"Using prefetched bridge quote for user {user_id}: quoteId={quote.get('quoteId')}")
+        return quote
+
+rhino_client = RhinoClient()
+bridge_prefetcher = BridgeQuotePrefetcher(rhino_client)
+
+async def get_bridge_quote(amount: float, ton_wallet: str, solana_wallet: str) -> dict:
+    return await rhino_client.get_bridge_quote(amount, ton_wallet, solana_wallet)
+
+async def commit_quote(quote_id: str):
+    return await rhino_client.commit_quote(quote_id)
+
+async def check_bridge_status(quote_id: str) -> dict:
+    return await rhino_client.check_bridge_status(quote_id)
+
+async def create_bridge(amount: float, solana_wallet: str, jetton_wallet: str, user_id: int = None) -> dict:
     try:
-        quote = await get_bridge_quote(amount, jetton_wallet, solana_wallet)
+        quote = None
+        if user_id is not None:
+            quote = await bridge_prefetcher.take(user_id, amount, jetton_wallet, solana_wallet)
+        if quote is None:
+            quote = await get_bridge_quote(amount, jetton_wallet, solana_wallet)
         quote_id = quote.get("quoteId")
         if not quote_id:
             logger.error("No quoteId in bridge quote response")
             return {"success": False}
-        
+
         await commit_quote(quote_id)
         jetton_amount = quote.get("fromAmount")  # Assuming fromAmount is in jetton units
         logger.info(f"Created bridge with quoteId: {quote_id}, jetton_amount: {jetton_amount}")
@@ -73,6 +192,9 @@ async def create_bridge(amount: float, solana_wallet: str, jetton_wallet: str) -
             "transaction_id": quote_id,
             "jetton_amount": jetton_amount
         }
+    except CircuitOpenError as e:
+        logger.warning(f"Failed to create bridge: {e}")
+        return {"success": False, "unavailable": True}
     except Exception as e:
         logger.error(f"Failed to create bridge: {e}")
         return {"success": False}
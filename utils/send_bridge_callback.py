@@ -0,0 +1,74 @@
+"""
+Local stand-in for Rhino's status callbacks.
+
+Posts one bridge callback to the running receiver the way the real sender
+would, and checks the receiver along the way: a wrong secret must get 401,
+the callback itself 200, and a repeat of it 200 again without being applied
+twice (the receiver logs it as a duplicate). With --check-db the pending
+row for the quote is looked up before and after, so the apply path is
+verified end to end.
+
+    python -m utils.send_bridge_callback <quote_id> [--status executed] [--amount-out 12400000]
+"""
+import argparse
+import asyncio
+import logging
+
+import aiohttp
+
+from config import get_config, BridgeCallbackConfig
+from utils.bridge_callbacks import SECRET_HEADER
+from utils.db import db_start, db_close, get_pending_bridge_by_tx_id
+
+logger = logging.getLogger(__name__)
+
+async def post(session: aiohttp.ClientSession, url: str, secret: str, payload: dict) -> int:
+    async with session.post(url, json=payload, headers={SECRET_HEADER: secret}) as response:
+        return response.status
+
+async def main(args: argparse.Namespace) -> bool:
+    config = get_config(BridgeCallbackConfig, "bridge_callbacks")
+    host = "127.0.0.1" if config.host == "0.0.0.0" else config.host
+    url = args.url or f"http://{host}:{config.port}{config.path}"
+    secret = config.secret.get_secret_value()
+    payload = {
+        "quote_id": args.quote_id,
+        "status": args.status,
+        "amount_out": args.amount_out,
+        "solana_tx_hash": args.solana_tx_hash
+    }
+
+    if args.check_db:
+        await db_start()
+        logger.info(f"Pending before: {await get_pending_bridge_by_tx_id(args.quote_id)}")
+
+    ok = True
+    async with aiohttp.ClientSession() as session:
+        for name, request_secret, expected in (
+            ("wrong secret", f"{secret}-wrong", 401),
+            ("callback", secret, 200),
+            ("duplicate", secret, 200)
+        ):
+            status = await post(session, url, request_secret, payload)
+            logger.info(f"{name}: HTTP {status} (expected {expected})")
+            ok = ok and status == expected
+
+    if args.check_db:
+        pending = await get_pending_bridge_by_tx_id(args.quote_id)
+        logger.info(f"Pending after: {pending}")
+        if args.status in ("executed", "failed", "stuck") and pending is not None:
+            logger.error(f"A final {args.status} callback left {args.quote_id} pending")
+            ok = False
+        await db_close()
+    return ok
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-8s %(message)s")
+    parser = argparse.ArgumentParser(description="Post a bridge status callback to the local receiver")
+    parser.add_argument("quote_id")
+    parser.add_argument("--status", default="executed")
+    parser.add_argument("--amount-out", default="1000000")
+    parser.add_argument("--solana-tx-hash", default="local-test")
+    parser.add_argument("--url", help="receiver URL; defaults to the bridge_callbacks config")
+    parser.add_argument("--check-db", action="store_true", help="verify the pending row before and after")
+    raise SystemExit(0 if asyncio.run(main(parser.parse_args())) else 1)
@@ -0,0 +1,101 @@
+import logging
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+_PENDING_BRIDGES = '''
+    SELECT id, user_id, solana_wallet, tx_id, created_at, check_attempts FROM transactions
+    WHERE status = 'pending' AND operation_type = 'bridge'
+'''
+
+# Hot statements (handler writes and the poller's per-cycle queries), prepared once per
+# pooled connection and then executed by name
+STATEMENTS = {
+    "log_transaction": '''
+        INSERT INTO transactions (user_id, solana_wallet, amount_in, commission_amount, operation_type, status, tx_id, solana_tx_hash)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        RETURNING id
+    ''',
+    "log_transactions_batch": '''
+        INSERT INTO transactions (user_id, solana_wallet, amount_in, commission_amount, operation_type, status,
+                                  tx_id, solana_tx_hash, created_at, log_ref)
+        SELECT * FROM UNNEST($1::bigint[], $2::text[], $3::bigint[], $4::bigint[], $5::text[], $6::text[],
+                             $7::text[], $8::text[], $9::timestamp[], $10::text[])
+        ON CONFLICT (log_ref, created_at) DO UPDATE SET log_ref = EXCLUDED.log_ref
+        RETURNING id, log_ref
+    ''',
+    "pending_bridges_due": _PENDING_BRIDGES + " AND next_check_at <= CURRENT_TIMESTAMP",
+    "pending_bridge_by_tx_id": _PENDING_BRIDGES + " AND tx_id = $1",
+    "claim_pending_bridges": '''
+        UPDATE transactions SET claimed_by = $1,
+            claim_expires_at = CURRENT_TIMESTAMP + make_interval(secs => $2)
+        WHERE id IN (
+            SELECT id FROM transactions
+            WHERE status = 'pending' AND operation_type = 'bridge'
+              AND next_check_at <= CURRENT_TIMESTAMP
+              AND (claim_expires_at IS NULL OR claim_expires_at < CURRENT_TIMESTAMP)
+            ORDER BY next_check_at
+            LIMIT $3
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, user_id, solana_wallet, tx_id, created_at, check_attempts
+    ''',
+    "next_bridge_check_at": '''
+        SELECT MIN(GREATEST(next_check_at, COALESCE(claim_expires_at, next_check_at)))
+        FROM transactions
+        WHERE status = 'pending' AND operation_type = 'bridge'
+    ''',
+    "fail_expired_bridges": '''
+        UPDATE transactions SET status = 'failed_bridge', claimed_by = NULL, claim_expires_at = NULL
+        WHERE status = 'pending' AND operation_type = 'bridge'
+          AND created_at < CURRENT_TIMESTAMP - make_interval(mins => $1)
+        RETURNING id, user_id, solana_wallet, status
+    ''',
+    "apply_bridge_updates": '''
+        WITH transitioned AS (
+            UPDATE transactions t
+            SET status = u.status, amount_out = u.amount_out, solana_tx_hash = u.solana_tx_hash,
+                claimed_by = NULL, claim_expires_at = NULL
+            FROM UNNEST($1::int[], $2::text[], $3::bigint[], $4::text[])
+                AS u(id, status, amount_out, solana_tx_hash)
+            WHERE t.id = u.id AND t.status = 'pending'
+            RETURNING t.id, t.user_id, t.solana_wallet, t.status, u.amount_out
+        ), rescheduled AS (
+            UPDATE transactions t
+            SET check_attempts = r.check_attempts,
+                next_check_at = CURRENT_TIMESTAMP + make_interval(secs => r.delay),
+                claimed_by = NULL, claim_expires_at = NULL
+            FROM UNNEST($5::int[], $6::int[], $7::float8[]) AS r(id, check_attempts, delay)
+            WHERE t.id = r.id AND t.status = 'pending'
+        )
+        SELECT * FROM transitioned
+    ''',
+}
+
+class StatementConnection(asyncpg.Connection):
+    """
+    Connection that runs STATEMENTS by name.
+
+    Statements go through asyncpg's per-connection statement cache, which
+    survives the connection going back to the pool (a PreparedStatement
+    object does not), so each one is prepared once per connection.
+    """
+
+    async def prepare_all(self):
+        for query in STATEMENTS.values():
+            # Prepares into the same cache fetch()/fetchval() look the query text up in
+            await self._get_statement(query, None)
+
+    async def fetch_statement(self, name: str, *args):
+        return await self.fetch(STATEMENTS[name], *args)
+
+    async def fetchrow_statement(self, name: str, *args):
+        return await self.fetchrow(STATEMENTS[name], *args)
+
+    async def fetchval_statement(self, name: str, *args):
+        return await self.fetchval(STATEMENTS[name], *args)
+
+async def prepare_statements(conn: StatementConnection):
+    # Pool init hook: new connections arrive with every hot statement already prepared
+    await conn.prepare_all()
+    logger.debug(f"Prepared {len(STATEMENTS)} statements on a new connection")
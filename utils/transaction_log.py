@@ -0,0 +1,159 @@
+import asyncio
+import asyncpg
+import json
+import logging
+from datetime import datetime, timedelta
+
+from config import TransactionLogConfig
+from utils.db import get_redis, insert_transaction_batch, get_db_time
+
+logger = logging.getLogger(__name__)
+
+# Errors caused by a row's own data; retrying such a row can never succeed
+REJECTED_ERRORS = (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError)
+
+class TransactionLogWriter:
+    """
+    Write-behind buffer for log_transaction.
+
+    Each row is first appended to a Redis stream, then buffered in process
+    and inserted with the rest of its batch once batch_size rows are queued
+    or flush_interval passes. Stream entries are deleted only after their
+    batch is committed; whatever is left in the stream after a crash is
+    replayed on the next start, and the (log_ref, created_at) upsert makes
+    the replay safe for rows that did reach the database. Rows are stamped
+    with the database's clock, tracked as an offset re-read after each flush,
+    so created_at agrees with rows the database stamps itself.
+
+    While the database is failing, flushes back off exponentially and
+    waiting callers get the error. A row the database rejects is moved to
+    dead_letter_key so it can't hold up the rest of its batch.
+    """
+
+    def __init__(self, config: TransactionLogConfig):
+        self.config = config
+        self.redis = get_redis()
+        self._buffer = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._clock_offset = timedelta()
+
+    async def start(self, recover: bool = True):
+        await self.sync_clock()
+        if recover:
+            await self.recover()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Transaction write-behind started (batch {self.config.batch_size}, "
+                    f"every {self.config.flush_interval}s)")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Left {len(self._buffer)} transactions in the stream for the next start: {e}")
+
+    async def submit(self, row: dict, wait: bool = True):
+        # The row's own timestamp is part of the upsert key, so a replay matches the stored row
+        row = {**row, "created_at": datetime.now() + self._clock_offset}
+        ref = await self.redis.xadd(self.config.stream_key, {"row": json.dumps(row, default=str)})
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._buffer.append((ref.decode(), row, future))
+        if len(self._buffer) >= self.config.batch_size:
+            self._wakeup.set()
+        if not wait:
+            return None
+        # A timeout only stops the wait; the row stays queued and is written later
+        return await asyncio.wait_for(future, self.config.wait_timeout)
+
+    async def _run(self):
+        failures = 0
+        while True:
+            if failures:
+                await asyncio.sleep(min(self.config.retry_delay * 2 ** (failures - 1), self.config.retry_delay_max))
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.config.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                failures = 0
+            except Exception as e:
+                # The rows stay buffered and in the stream until a retry gets them in
+                failures += 1
+                logger.error(f"Failed to flush {len(self._buffer)} buffered transactions (attempt {failures}): {e}")
+
+    async def sync_clock(self):
+        try:
+            self._clock_offset = await get_db_time() - datetime.now()
+        except Exception as e:
+            logger.warning(f"Failed to read the database clock, keeping offset {self._clock_offset}: {e}")
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        await self._flush()
+        # Once per flushed batch, so the offset follows drift between this host and the database
+        await self.sync_clock()
+
+    async def _flush(self):
+        while self._buffer:
+            batch = self._buffer[:self.config.batch_size]
+            try:
+                ids = await self._write(batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    if future and not future.done():
+                        future.set_exception(e)
+                raise
+            del self._buffer[:len(batch)]
+            for ref, _, future in batch:
+                if future and not future.done():
+                    future.set_result(ids.get(ref))
+            await self.redis.xdel(self.config.stream_key, *(ref for ref, _, _ in batch))
+
+    async def _write(self, batch: list) -> dict:
+        try:
+            return await self._insert(batch)
+        except REJECTED_ERRORS:
+            pass
+        # Some row in the batch is bad: insert them one at a time so the rest still go in
+        ids = {}
+        for entry in batch:
+            try:
+                ids.update(await self._insert([entry]))
+            except REJECTED_ERRORS as e:
+                await self._reject(entry, e)
+        return ids
+
+    async def _insert(self, batch: list) -> dict:
+        return await insert_transaction_batch([{**row, "log_ref": ref} for ref, row, _ in batch])
+
+    async def _reject(self, entry: tuple, error: Exception):
+        ref, row, future = entry
+        logger.error(f"Transaction {ref} rejected, moving it to {self.config.dead_letter_key}: {error}")
+        await self.redis.xadd(self.config.dead_letter_key, {"row": json.dumps(row, default=str), "error": str(error)})
+        if future and not future.done():
+            future.set_exception(error)
+
+    async def recover(self):
+        replayed = 0
+        while True:
+            entries = await self.redis.xrange(self.config.stream_key, count=self.config.batch_size)
+            if not entries:
+                break
+            batch = []
+            for ref, fields in entries:
+                row = json.loads(fields[b"row"])
+                row["created_at"] = datetime.fromisoformat(row["created_at"])
+                batch.append((ref.decode(), row, None))
+            await self._write(batch)
+            await self.redis.xdel(self.config.stream_key, *(ref for ref, _ in entries))
+            replayed += len(entries)
+        if replayed:
+            logger.info(f"Replayed {replayed} transactions left in {self.config.stream_key}")
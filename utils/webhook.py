@@ -0,0 +1,81 @@
+import asyncio
+import hmac
+import logging
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from config import WebhookConfig
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+class WebhookServer:
+    """
+    aiohttp endpoint feeding Telegram updates into Dispatcher.feed_update.
+
+    At most max_in_flight updates are processed at once. When the limit is
+    reached a request waits up to backpressure_timeout for a free slot and
+    is then answered with 503, so Telegram redelivers it later instead of
+    the process queueing unbounded work.
+    """
+
+    def __init__(self, bot: Bot, dp: Dispatcher, config: WebhookConfig, **workflow_data):
+        self.bot = bot
+        self.dp = dp
+        self.config = config
+        self.workflow_data = workflow_data
+        self._slots = asyncio.Semaphore(config.max_in_flight)
+        self._tasks = set()
+        self._runner = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        secret = self.config.secret_token.get_secret_value()
+        if secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            return web.Response(status=401)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.config.backpressure_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook backpressure: {self.in_flight} updates in flight, rejecting update")
+            return web.Response(status=503)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception as e:
+            self._slots.release()
+            logger.warning(f"Malformed webhook update: {e}")
+            return web.Response(status=400)
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response(status=200)
+
+    async def _process(self, update: Update):
+        try:
+            await self.dp.feed_update(self.bot, update, **self.workflow_data)
+        except Exception as e:
+            logger.error(f"Failed to process update {update.update_id}: {e}", exc_info=True)
+        finally:
+            self._slots.release()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(self.config.path, self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        # reuse_port lets every pre-forked worker bind the same port
+        site = web.TCPSite(self._runner, self.config.host, self.config.port, reuse_port=self.config.workers > 1)
+        await site.start()
+        logger.info(f"Webhook server listening on {self.config.host}:{self.config.port}{self.config.path}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._tasks:
+            logger.info(f"Waiting for {len(self._tasks)} in-flight updates")
+            await asyncio.gather(*self._tasks, return_exceptions=True)